@@ -0,0 +1,107 @@
+# benchmarks/fake_llm.py
+"""
+LLM determinista para los benchmarks: devuelve SQL predefinido para cada
+pregunta, una respuesta fija con bloque DATA y sugerencias fijas, con una
+latencia simulada opcional.
+"""
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from synthetic_data import ORDERS_TABLE, ENTITIES_TABLE
+
+# Preguntas del benchmark y el SQL que "genera" el LLM; SQL portable entre MySQL y SQLite
+QUESTIONS: Dict[str, str] = {
+    "¿Cuál es el monto total de órdenes por departamento?": f"""
+        SELECT e.departamento, SUM(o.monto_total) AS monto_total, COUNT(*) AS ordenes
+        FROM {ORDERS_TABLE} o JOIN {ENTITIES_TABLE} e ON o.ruc_entidad = e.ruc_entidad
+        GROUP BY e.departamento ORDER BY monto_total DESC""",
+    "¿Cuáles son los 10 proveedores con mayor monto adjudicado?": f"""
+        SELECT razon_social_proveedor, SUM(monto_total) AS monto_total
+        FROM {ORDERS_TABLE} GROUP BY razon_social_proveedor
+        ORDER BY monto_total DESC LIMIT 10""",
+    "¿Cuántas órdenes hay por estado?": f"""
+        SELECT estado_orden, COUNT(*) AS ordenes FROM {ORDERS_TABLE}
+        GROUP BY estado_orden ORDER BY ordenes DESC""",
+    "¿Cuál es el ticket promedio por acuerdo marco?": f"""
+        SELECT acuerdo_marco, AVG(monto_total) AS ticket_promedio, COUNT(*) AS ordenes
+        FROM {ORDERS_TABLE} GROUP BY acuerdo_marco ORDER BY ticket_promedio DESC""",
+    "¿Cómo evolucionó el gasto mensual?": f"""
+        SELECT SUBSTR(CAST(fecha_proceso AS CHAR(19)), 1, 7) AS mes, SUM(monto_total) AS monto_total
+        FROM {ORDERS_TABLE} GROUP BY mes ORDER BY mes""",
+    "Lista las órdenes anuladas más grandes": f"""
+        SELECT orden_electronica, razon_social_proveedor, monto_total, fecha_proceso
+        FROM {ORDERS_TABLE} WHERE estado_orden = 'ANULADA'
+        ORDER BY monto_total DESC LIMIT 50""",
+    "Muestra todas las órdenes de Lima": f"""
+        SELECT o.orden_electronica, o.razon_social_proveedor, o.monto_total, o.fecha_proceso
+        FROM {ORDERS_TABLE} o JOIN {ENTITIES_TABLE} e ON o.ruc_entidad = e.ruc_entidad
+        WHERE e.departamento = 'LIMA'""",
+    "¿Qué gasto tiene cada nivel de gobierno por catálogo?": f"""
+        SELECT e.nivel_gobierno, o.catalogo, SUM(o.monto_total) AS monto_total
+        FROM {ORDERS_TABLE} o JOIN {ENTITIES_TABLE} e ON o.ruc_entidad = e.ruc_entidad
+        GROUP BY e.nivel_gobierno, o.catalogo ORDER BY e.nivel_gobierno, monto_total DESC"""
+}
+
+ANSWER = (
+    "El análisis muestra que el gasto se concentra en pocas categorías, "
+    "con una distribución de cola larga típica de las compras públicas. "
+    "Las tres primeras categorías explican la mayor parte del monto total.\n"
+    'DATA:[("LIMA", 1500000), ("AREQUIPA", 420000), ("CUSCO", 310000)]'
+)
+
+SUGGESTIONS = (
+    "1. ¿Qué proveedores concentran el mayor monto?\n"
+    "2. ¿Cómo varía el gasto mensual por departamento?\n"
+    "3. ¿Qué acuerdos marco tienen el ticket promedio más alto?"
+)
+
+class CannedSQLLLM(LLM):
+    """
+    Responde según el prompt: SQL predefinido para el prompt de SQL,
+    ANSWER para el de respuesta y SUGGESTIONS para el de sugerencias.
+    Reporta tokens aproximados (caracteres / 4) como lo hace Ollama.
+    """
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "canned-sql"
+
+    def _respond(self, prompt: str) -> str:
+        if prompt.rstrip().endswith("Query:"):
+            match = re.search(r"Question: (.*)", prompt)
+            question = match.group(1).strip() if match else ""
+            return " ".join(QUESTIONS.get(question, f"SELECT COUNT(*) FROM {ORDERS_TABLE}").split())
+        if "Dado el siguiente esquema" in prompt:
+            return SUGGESTIONS
+        return ANSWER
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        for word in re.findall(r"\S+\s*", self._respond(prompt)):
+            chunk = GenerationChunk(text=word)
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any):
+        result = super()._generate(prompts, stop=stop, run_manager=run_manager, **kwargs)
+        for prompt, generations in zip(prompts, result.generations):
+            for generation in generations:
+                generation.generation_info = {
+                    "prompt_eval_count": len(prompt) // 4,
+                    "eval_count": len(generation.text) // 4
+                }
+        return result
@@ -0,0 +1,164 @@
+# benchmarks/synthetic_data.py
+"""
+Tablas sintéticas con la forma de los reportes de órdenes de compra de
+Perú Compras, generadas de forma determinista a partir de una semilla.
+
+Las tablas usan tipos portables de SQLAlchemy para poder crearse tanto en
+MySQL como en SQLite.
+"""
+import csv
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+from sqlalchemy import (
+    Column, Integer, MetaData, Numeric, String, DateTime, Table, Engine
+)
+
+TABLE_PREFIX = "bench_"
+ORDERS_TABLE = f"{TABLE_PREFIX}ordenes_compra"
+ENTITIES_TABLE = f"{TABLE_PREFIX}entidades"
+
+DEPARTAMENTOS = [
+    "LIMA", "AREQUIPA", "CUSCO", "PIURA", "LA LIBERTAD", "JUNIN", "LAMBAYEQUE",
+    "PUNO", "CAJAMARCA", "LORETO", "ICA", "ANCASH", "SAN MARTIN", "UCAYALI"
+]
+NIVELES_GOBIERNO = ["GOBIERNO NACIONAL", "GOBIERNO REGIONAL", "GOBIERNO LOCAL"]
+ESTADOS_ORDEN = ["ACEPTADA", "PUBLICADA", "ENTREGADA", "RESUELTA", "ANULADA"]
+ACUERDOS_MARCO = [
+    "EXT-CE-2022-5 COMPUTADORAS DE ESCRITORIO",
+    "EXT-CE-2022-1 MATERIALES E INSUMOS DE LIMPIEZA",
+    "EXT-CE-2021-9 ÚTILES DE ESCRITORIO",
+    "EXT-CE-2022-3 EMISIÓN DE BOLETOS AÉREOS",
+    "EXT-CE-2021-7 NEUMÁTICOS",
+    "EXT-CE-2022-4 MOBILIARIO EN GENERAL"
+]
+CATALOGOS = ["BIENES", "SERVICIOS", "CONSUMIBLES", "EQUIPAMIENTO"]
+
+metadata = MetaData()
+
+entities = Table(
+    ENTITIES_TABLE, metadata,
+    Column("ruc_entidad", String(11), primary_key=True),
+    Column("razon_social_entidad", String(200)),
+    Column("departamento", String(50)),
+    Column("nivel_gobierno", String(50))
+)
+
+orders = Table(
+    ORDERS_TABLE, metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("orden_electronica", String(30)),
+    Column("ruc_proveedor", String(11)),
+    Column("razon_social_proveedor", String(200)),
+    Column("ruc_entidad", String(11)),
+    Column("acuerdo_marco", String(200)),
+    Column("catalogo", String(50)),
+    Column("estado_orden", String(30)),
+    Column("fecha_proceso", DateTime),
+    Column("fecha_formalizacion", DateTime),
+    Column("nro_items", Integer),
+    Column("sub_total", Numeric(15, 2)),
+    Column("igv", Numeric(15, 2)),
+    Column("monto_total", Numeric(15, 2))
+)
+
+def generate_entities(count: int, seed: int) -> List[Dict[str, Any]]:
+    """Entidades públicas compradoras"""
+    rng = random.Random(seed)
+    return [
+        {
+            "ruc_entidad": f"20{100000000 + idx:09d}",
+            "razon_social_entidad": f"ENTIDAD PUBLICA {idx:04d}",
+            "departamento": rng.choice(DEPARTAMENTOS),
+            "nivel_gobierno": rng.choice(NIVELES_GOBIERNO)
+        }
+        for idx in range(count)
+    ]
+
+def generate_orders(count: int, entity_rucs: List[str], seed: int) -> Iterator[Dict[str, Any]]:
+    """Órdenes de compra con montos, fechas y estados distribuidos como en los reportes reales"""
+    rng = random.Random(seed + 1)
+    suppliers = [(f"10{400000000 + idx:09d}", f"PROVEEDOR {idx:05d} S.A.C.") for idx in range(max(count // 50, 10))]
+    start = datetime(2023, 1, 1)
+    for idx in range(count):
+        supplier_ruc, supplier_name = rng.choice(suppliers)
+        processed = start + timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+        # Montos con cola larga: pocas órdenes concentran la mayor parte del gasto
+        sub_total = round(rng.lognormvariate(8, 1.4), 2)
+        igv = round(sub_total * 0.18, 2)
+        yield {
+            "orden_electronica": f"OCAM-{processed.year}-{idx:08d}",
+            "ruc_proveedor": supplier_ruc,
+            "razon_social_proveedor": supplier_name,
+            "ruc_entidad": rng.choice(entity_rucs),
+            "acuerdo_marco": rng.choice(ACUERDOS_MARCO),
+            "catalogo": rng.choice(CATALOGOS),
+            "estado_orden": rng.choices(ESTADOS_ORDEN, weights=[50, 20, 20, 5, 5])[0],
+            "fecha_proceso": processed,
+            "fecha_formalizacion": processed + timedelta(days=rng.randrange(0, 15)),
+            "nro_items": rng.randint(1, 40),
+            "sub_total": sub_total,
+            "igv": igv,
+            "monto_total": round(sub_total + igv, 2)
+        }
+
+def seed_database(engine: Engine, rows: int, seed: int = 42, batch_size: int = 5000) -> Dict[str, int]:
+    """
+    Recrea las tablas sintéticas y las llena con rows órdenes de compra
+
+    Returns:
+        Dict[str, int]: Filas insertadas por tabla
+    """
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    entity_rows = generate_entities(max(rows // 200, 20), seed)
+    with engine.begin() as conn:
+        conn.execute(entities.insert(), entity_rows)
+        batch = []
+        for order in generate_orders(rows, [row["ruc_entidad"] for row in entity_rows], seed):
+            batch.append(order)
+            if len(batch) >= batch_size:
+                conn.execute(orders.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(orders.insert(), batch)
+    return {ENTITIES_TABLE: len(entity_rows), ORDERS_TABLE: rows}
+
+def drop_tables(engine: Engine):
+    metadata.drop_all(engine)
+
+def write_orders_csv(path: Path, rows: int, seed: int = 42) -> Path:
+    """
+    Escribe las órdenes en el formato de los CSV de Perú Compras que espera
+    scripts/mysql/load.py: latin1, separador ';', coma decimal y encabezados
+    en mayúsculas con tildes
+    """
+    headers = {
+        "orden_electronica": "ORDEN_ELECTRÓNICA",
+        "ruc_proveedor": "RUC_PROVEEDOR",
+        "razon_social_proveedor": "RAZÓN_SOCIAL_PROVEEDOR",
+        "ruc_entidad": "RUC_ENTIDAD",
+        "acuerdo_marco": "ACUERDO_MARCO",
+        "catalogo": "CATÁLOGO",
+        "estado_orden": "ESTADO_ORDEN",
+        "fecha_proceso": "FECHA_PROCESO",
+        "fecha_formalizacion": "FECHA_FORMALIZACIÓN",
+        "nro_items": "NRO_ITEMS",
+        "sub_total": "SUB_TOTAL",
+        "igv": "IGV",
+        "monto_total": "MONTO_TOTAL"
+    }
+    entity_rucs = [row["ruc_entidad"] for row in generate_entities(max(rows // 200, 20), seed)]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="latin1", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(headers.values())
+        for order in generate_orders(rows, entity_rucs, seed):
+            writer.writerow([
+                value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime)
+                else f"{value:.2f}".replace(".", ",") if isinstance(value, float)
+                else value
+                for value in (order[key] for key in headers)
+            ])
+    return path
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import os
 import logging
+from pathlib import Path
 from typing import Dict
 
 logger = logging.getLogger(__name__)
@@ -33,6 +34,9 @@ class Config:
 # LLM Settings
 DEFAULT_PROVIDER = Config.get_env("DEFAULT_LLM_PROVIDER", "ollama")
 DEFAULT_TEMPERATURE = float(Config.get_env("DEFAULT_TEMPERATURE", "0.7"))
+LLM_REGISTRY_MAX_ENTRIES = int(Config.get_env("LLM_REGISTRY_MAX_ENTRIES", "8"))
+LLM_REGISTRY_TTL = int(Config.get_env("LLM_REGISTRY_TTL", "3600"))
+STREAM_RESPONSES = Config.get_env("STREAM_RESPONSES", "true").lower() == "true"
 
 # OpenAI Config
 OPENAI_API_KEY = Config.get_env("OPENAI_API_KEY")
@@ -43,12 +47,78 @@ OPENAI_MODELS = Config.parse_models(Config.get_env("OPENAI_MODELS", ""))
 OLLAMA_BASE_URL = Config.get_env("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_DEFAULT_MODEL = Config.get_env("OLLAMA_DEFAULT_MODEL", "llama3:8b-instruct-q8_0")
 OLLAMA_MODELS = Config.parse_models(Config.get_env("OLLAMA_MODELS", ""))
+OLLAMA_HEALTH_INTERVAL = float(Config.get_env("OLLAMA_HEALTH_INTERVAL", "30"))
+OLLAMA_HEALTH_TIMEOUT = float(Config.get_env("OLLAMA_HEALTH_TIMEOUT", "2"))
 
 # Database Config
 MYSQL_USER = Config.get_env("MYSQL_USER")
 MYSQL_PASSWORD = Config.get_env("MYSQL_PASSWORD")
 MYSQL_HOST = Config.get_env("MYSQL_HOST")
 MYSQL_DATABASE = Config.get_env("MYSQL_DATABASE")
+# URI de SQLAlchemy que reemplaza a la configuración de MySQL (p. ej. SQLite para benchmarks)
+DATABASE_URI = Config.get_env("DATABASE_URI", "")
+
+# Connection Pool Config
+DB_POOL_SIZE = int(Config.get_env("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(Config.get_env("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(Config.get_env("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(Config.get_env("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = Config.get_env("DB_POOL_PRE_PING", "true").lower() == "true"
+QUERY_STREAM_CHUNK_SIZE = int(Config.get_env("QUERY_STREAM_CHUNK_SIZE", "5000"))
+DB_ASYNC_DRIVER = Config.get_env("DB_ASYNC_DRIVER", "aiomysql")
+ASYNC_PIPELINE = Config.get_env("ASYNC_PIPELINE", "false").lower() == "true"
+
+# Result Size Guard Config
+RESULT_ROW_CAP = int(Config.get_env("RESULT_ROW_CAP", "1000"))
+RESULT_COUNT_TOTAL = Config.get_env("RESULT_COUNT_TOTAL", "false").lower() == "true"
+LLM_RESULT_ROWS = int(Config.get_env("LLM_RESULT_ROWS", "50"))
+LLM_RESULT_TOP_K = int(Config.get_env("LLM_RESULT_TOP_K", "5"))
+
+# Cache Config
+PROJECT_ROOT = Path(__file__).parent.parent
+CACHE_DIR = Config.get_env("CACHE_DIR", str(PROJECT_ROOT / ".cache"))
+SCHEMA_CACHE_TTL = int(Config.get_env("SCHEMA_CACHE_TTL", "600"))
+SCHEMA_CACHE_MAX_ENTRIES = int(Config.get_env("SCHEMA_CACHE_MAX_ENTRIES", "64"))
+RESULT_CACHE_ENABLED = Config.get_env("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_TTL = int(Config.get_env("RESULT_CACHE_TTL", "300"))
+RESULT_CACHE_MAX_ENTRIES = int(Config.get_env("RESULT_CACHE_MAX_ENTRIES", "256"))
+RESULT_CACHE_MAX_ROWS = int(Config.get_env("RESULT_CACHE_MAX_ROWS", "10000"))
+# Segundos entre lecturas de information_schema para las versiones de datos
+RESULT_VERSION_CHECK_INTERVAL = float(Config.get_env("RESULT_VERSION_CHECK_INTERVAL", "10"))
+
+# Column Profiling Config
+PROFILE_CACHE_TTL = int(Config.get_env("PROFILE_CACHE_TTL", "3600"))
+PROFILE_CACHE_MAX_ENTRIES = int(Config.get_env("PROFILE_CACHE_MAX_ENTRIES", "256"))
+PROFILE_TOP_K = int(Config.get_env("PROFILE_TOP_K", "10"))
+PROFILE_BATCH_SIZE = int(Config.get_env("PROFILE_BATCH_SIZE", "10"))
+ROW_COUNT_MODE = Config.get_env("ROW_COUNT_MODE", "estimate").lower()
+
+# Schema Suggestions Config
+SUGGESTIONS_CACHE_TTL = int(Config.get_env("SUGGESTIONS_CACHE_TTL", "86400"))
+SUGGESTIONS_CACHE_MAX_ENTRIES = int(Config.get_env("SUGGESTIONS_CACHE_MAX_ENTRIES", "64"))
+SUGGESTIONS_REFRESH_INTERVAL = int(Config.get_env("SUGGESTIONS_REFRESH_INTERVAL", "3600"))
+
+# Analysis Config
+ANALYSIS_TIMEOUT = float(Config.get_env("ANALYSIS_TIMEOUT", "10"))
+ANALYSIS_MAX_WORKERS = int(Config.get_env("ANALYSIS_MAX_WORKERS", "8"))
+
+# RAG Config
+VECTOR_STORE_DIR = Config.get_env("VECTOR_STORE_DIR", str(Path(CACHE_DIR) / "vector_store"))
+EMBEDDING_CACHE_PATH = Config.get_env("EMBEDDING_CACHE_PATH", str(Path(CACHE_DIR) / "embeddings.sqlite"))
+RAG_CHUNK_SIZE = int(Config.get_env("RAG_CHUNK_SIZE", "1000"))
+RAG_CHUNK_OVERLAP = int(Config.get_env("RAG_CHUNK_OVERLAP", "200"))
+DOCS_WATCH_INTERVAL = float(Config.get_env("DOCS_WATCH_INTERVAL", "30"))
+
+# Semantic SQL Cache Config
+SEMANTIC_CACHE_ENABLED = Config.get_env("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(Config.get_env("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(Config.get_env("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+SEMANTIC_CACHE_TTL = int(Config.get_env("SEMANTIC_CACHE_TTL", "86400"))
+
+# Tracing Config
+TRACING_ENABLED = Config.get_env("TRACING_ENABLED", "true").lower() == "true"
+# Vacío por defecto: el archivo no rota, así que la app no exporta salvo que se configure
+TRACE_EXPORT_PATH = Config.get_env("TRACE_EXPORT_PATH", "")
 
 # Get provider-specific default model
 def get_default_model(provider: str) -> str:
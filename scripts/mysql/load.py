@@ -1,12 +1,29 @@
 import os
+import sys
+import time
+import argparse
 import mysql.connector
 from mysql.connector import Error
 from dotenv import load_dotenv
 import pandas as pd
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+root_path = Path(__file__).parent.parent.parent
+sys.path.append(str(root_path))
+
+from src.utils.cache import touch_invalidation_marker
+from src.utils.table_stats import update_table_stats
+from src.utils.bulk_load import bulk_load_dataframe, LocalInfileUnavailable
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,8 +35,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Configuración específica para los CSVs de Perú Compras
+CSV_READ_OPTIONS = {
+    'encoding': 'latin1',
+    'sep': ';',
+    'decimal': ',',
+    'thousands': '.'
+}
+DATE_COLUMNS = ['FECHA_PROCESO', 'FECHA_FORMALIZACIÓN', 'FECHA_ÚLTIMO_ESTADO']
+INSERT_BATCH_SIZE = 1000
+DEFAULT_CHUNKSIZE = 50000
+DEFAULT_SAMPLE_ROWS = 10000
+# Textos más largos que esto se guardan como TEXT, al crear la tabla y al ampliarla
+MAX_VARCHAR_LENGTH = 500
+INTEGER_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'bigint'}
+NUMERIC_TYPES = INTEGER_TYPES | {'decimal', 'float', 'double'}
+TEMPORAL_TYPES = {'date', 'datetime', 'timestamp'}
+
+def varchar_type(max_length: int) -> str:
+    """VARCHAR con holgura para textos de max_length caracteres, o TEXT si no cabe"""
+    width = max(int(max_length) * 2, 50)
+    return f'VARCHAR({width})' if width <= MAX_VARCHAR_LENGTH else 'TEXT'
+
+def peak_memory_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso en MB, si la plataforma lo expone"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB y macOS bytes
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
 class CSVLoader:
-    def __init__(self):
+    def __init__(self, chunksize: Optional[int] = None, sample_rows: int = DEFAULT_SAMPLE_ROWS,
+                 bulk: bool = False):
+        """
+        Args:
+            chunksize (Optional[int]): Si se indica, los CSV se leen y cargan por
+                bloques de ese número de filas en lugar de leerse completos
+            sample_rows (int): Filas usadas para inferir los tipos en modo por bloques
+            bulk (bool): Cargar con LOAD DATA LOCAL INFILE; si el servidor no lo
+                permite se usan inserciones por lotes
+        """
         # Cargar variables de entorno
         load_dotenv()
         
@@ -29,9 +85,15 @@ class CSVLoader:
             'host': os.getenv('MYSQL_HOST'),
             'database': os.getenv('MYSQL_DATABASE'),
             'raise_on_warnings': True,
-            'auth_plugin': 'mysql_native_password'
+            'auth_plugin': 'mysql_native_password',
+            'allow_local_infile': bulk
         }
         
+        self.chunksize = chunksize
+        self.sample_rows = sample_rows
+        self.bulk = bulk
+        # Registros leídos por archivo, para el resumen de throughput
+        self.file_rows: Dict[str, int] = {}
         self.conn = None
         self.cursor = None
 
@@ -47,6 +109,14 @@ class CSVLoader:
             logger.error(f"Error de conexión: {str(e)}")
             return False
 
+    def close(self):
+        """Cierra el cursor y la conexión"""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn and self.conn.is_connected():
+            self.conn.close()
+            logger.info("Conexión cerrada")
+
     def verify_table_exists(self, table_name: str) -> bool:
         """Verifica si una tabla existe"""
         try:
@@ -127,8 +197,7 @@ class CSVLoader:
                 
                 # Ajustar longitud de VARCHAR basado en los datos
                 if sql_type == 'VARCHAR(255)':
-                    max_length = df[col].astype(str).str.len().max()
-                    sql_type = f'VARCHAR({min(max(max_length * 2, 50), 500)})'
+                    sql_type = varchar_type(df[col].astype(str).str.len().max())
                 
                 columns.append(f"`{clean_col}` {sql_type}")
             
@@ -145,6 +214,8 @@ class CSVLoader:
             
             self.cursor.execute(create_table_sql)
             self.conn.commit()
+            # Avisar a la app que el esquema cambió para invalidar su cache
+            touch_invalidation_marker("schema")
             logger.info(f"Tabla {table_name} creada o verificada exitosamente")
             logger.info("Mapeo de columnas realizado:")
             for original, clean in clean_column_names.items():
@@ -156,8 +227,144 @@ class CSVLoader:
             logger.error(f"Error creando tabla {table_name}: {str(e)}")
             return False
 
+    def update_row_count(self, table_name: str):
+        """Guarda el conteo exacto de filas para que la app no ejecute COUNT(*)"""
+        try:
+            update_table_stats(self.cursor, table_name)
+            self.conn.commit()
+        except Error as e:
+            logger.warning(f"No se pudo actualizar el conteo de filas de {table_name}: {str(e)}")
+
+    def prepare_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convierte las fechas y reemplaza los nulos por None para MySQL"""
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+        
+        # Reemplazar valores NaN/None por NULL para MySQL
+        df = df.replace({pd.NA: None, pd.NaT: None})
+        return df.where(pd.notnull(df), None)
+
+    def insert_dataframe(self, table_name: str, df: pd.DataFrame, columns: List[str],
+                         log_batches: bool = True, raise_errors: bool = False) -> int:
+        """
+        Inserta el DataFrame en lotes con INSERT IGNORE
+        
+        Args:
+            raise_errors (bool): Propagar el error de un lote en lugar de
+                registrarlo y continuar con el siguiente
+        
+        Returns:
+            int: Registros nuevos insertados (los duplicados se omiten)
+        """
+        placeholders = ", ".join(["%s"] * len(columns))
+        insert_sql = f"""
+        INSERT IGNORE INTO `{table_name}` 
+        (`{'`, `'.join(columns)}`) 
+        VALUES ({placeholders})
+        """
+        registros_insertados = 0
+        total_lotes = len(df) // INSERT_BATCH_SIZE + 1
+        
+        for i in range(0, len(df), INSERT_BATCH_SIZE):
+            try:
+                batch = df.iloc[i:i + INSERT_BATCH_SIZE]
+                # Convertir el batch a una lista de tuplas, reemplazando NaN por None
+                values = [tuple(None if pd.isna(x) else x for x in row) for row in batch.values]
+                
+                self.cursor.executemany(insert_sql, values)
+                self.conn.commit()
+                registros_insertados += self.cursor.rowcount
+                
+                if log_batches:
+                    logger.info(f"Procesado lote {i//INSERT_BATCH_SIZE + 1} de {total_lotes}")
+            except Exception as e:
+                if raise_errors:
+                    raise
+                logger.error(f"Error insertando lote {i//INSERT_BATCH_SIZE + 1}: {str(e)}")
+                continue
+        
+        return registros_insertados
+
+    def write_dataframe(self, table_name: str, df: pd.DataFrame, columns: List[str],
+                        log_batches: bool = True, raise_errors: bool = False) -> int:
+        """
+        Carga el DataFrame con LOAD DATA LOCAL INFILE en modo bulk, o con
+        inserciones por lotes si no está activo o falla
+        
+        Returns:
+            int: Registros nuevos insertados
+        """
+        if self.bulk:
+            try:
+                return bulk_load_dataframe(self.conn, self.cursor, table_name, df, columns)
+            except LocalInfileUnavailable as e:
+                # No reintentar en cada archivo o bloque
+                self.bulk = False
+                logger.warning(f"LOAD DATA LOCAL INFILE no permitido ({str(e)}), usando inserciones por lotes")
+            except Error as e:
+                logger.warning(f"Error en la carga masiva de {table_name} ({str(e)}), usando inserciones por lotes")
+        return self.insert_dataframe(table_name, df, columns, log_batches=log_batches, raise_errors=raise_errors)
+
+    def get_column_types(self, table_name: str) -> Dict[str, Tuple[str, Optional[int]]]:
+        """Tipo (DATA_TYPE) y longitud máxima de texto de cada columna de la tabla"""
+        self.cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table_name,)
+        )
+        return {
+            name: (data_type.lower(), int(length) if length is not None else None)
+            for name, data_type, length in self.cursor.fetchall()
+        }
+
+    def adapt_columns(self, table_name: str, df: pd.DataFrame,
+                      column_types: Dict[str, Tuple[str, Optional[int]]]):
+        """
+        Ajusta las columnas a un bloque cuyos valores no caben en los tipos
+        inferidos de la muestra: amplía los VARCHAR, pasa a DECIMAL los
+        enteros que reciben decimales y a texto las columnas numéricas o de
+        fecha que reciben otros valores. Así el bloque no se rechaza.
+        """
+        changed = False
+        for col in df.columns:
+            if col not in column_types:
+                continue
+            data_type, length = column_types[col]
+            values = df[col].dropna()
+            if values.empty:
+                continue
+            sql_type = None
+            if data_type == 'varchar':
+                max_length = values.astype(str).str.len().max()
+                if max_length > length:
+                    sql_type = varchar_type(max_length)
+            elif data_type in NUMERIC_TYPES:
+                numbers = pd.to_numeric(values, errors='coerce')
+                if numbers.isna().any():
+                    # Los números ya cargados se conservan como texto
+                    sql_type = varchar_type(max(values.astype(str).str.len().max(), 20))
+                elif data_type in INTEGER_TYPES and (numbers % 1 != 0).any():
+                    sql_type = 'DECIMAL(15,2)'
+            elif data_type in TEMPORAL_TYPES:
+                if not values.map(lambda value: isinstance(value, date)).all():
+                    sql_type = varchar_type(max(values.astype(str).str.len().max(), 19))
+            if sql_type is None:
+                continue
+            self.cursor.execute(f"ALTER TABLE `{table_name}` MODIFY `{col}` {sql_type}")
+            logger.info(f"Columna {col} cambiada de {data_type.upper()} a {sql_type}")
+            new_type = sql_type.split('(')[0].lower()
+            new_length = int(sql_type[8:-1]) if new_type == 'varchar' else None
+            column_types[col] = (new_type, new_length)
+            changed = True
+        if changed:
+            # El esquema cambió: avisar a la app
+            touch_invalidation_marker("schema")
+
     def load_csv_to_table(self, csv_path: str) -> bool:
         """Carga un archivo CSV a una tabla en MySQL"""
+        if self.chunksize:
+            return self.load_csv_streaming(csv_path)
         try:
             # Obtener nombre de tabla del nombre del archivo
             table_name = Path(csv_path).stem.lower()
@@ -165,24 +372,7 @@ class CSVLoader:
             # Configuración específica para los CSVs de Perú Compras
             df = None
             try:
-                # Primero leer el CSV
-                df = pd.read_csv(
-                    csv_path,
-                    encoding='latin1',
-                    sep=';',
-                    decimal=',',
-                    thousands='.'
-                )
-                
-                # Luego convertir las columnas de fecha usando to_datetime
-                date_columns = ['FECHA_PROCESO', 'FECHA_FORMALIZACIÓN', 'FECHA_ÚLTIMO_ESTADO']
-                for col in date_columns:
-                    if col in df.columns:
-                        df[col] = pd.to_datetime(df[col], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-                
-                # Reemplazar valores NaN/None por NULL para MySQL
-                df = df.replace({pd.NA: None, pd.NaT: None})
-                df = df.where(pd.notnull(df), None)
+                df = self.prepare_dataframe(pd.read_csv(csv_path, **CSV_READ_OPTIONS))
                 
                 total_registros = len(df)
                 logger.info(f"""
@@ -200,54 +390,144 @@ class CSVLoader:
             if not self.create_table_from_df(table_name, df):
                 return False
 
-            # Preparar datos para inserción
+            # Insertar datos con LOAD DATA o en lotes usando INSERT IGNORE
             columns = [col.replace(" ", "_").replace("-", "_").lower() for col in df.columns]
-            placeholders = ", ".join(["%s"] * len(columns))
+            registros_insertados = self.write_dataframe(table_name, df, columns)
+
+            logger.info(f"""
+            Archivo {csv_path} procesado:
+            - Total registros en archivo: {total_registros}
+            - Registros nuevos insertados: {registros_insertados}
+            - Registros duplicados omitidos: {total_registros - registros_insertados}
+            """)
+            self.file_rows[csv_path] = total_registros
+            self.update_row_count(table_name)
+            # Invalidar perfiles y resultados cacheados por la app
+            touch_invalidation_marker("data")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error cargando archivo {csv_path}: {str(e)}")
+            return False
+
+    def load_csv_streaming(self, csv_path: str) -> bool:
+        """
+        Carga un CSV por bloques de self.chunksize filas, con memoria acotada
+        
+        Los tipos de las columnas se infieren de las primeras self.sample_rows
+        filas; si un bloque posterior trae valores que no caben (textos más
+        largos, decimales o texto en columnas numéricas o de fecha), la
+        columna se amplía. Si aun así un lote se rechaza, la carga se aborta
+        en lugar de omitirlo y se borran las filas que ya había insertado.
+        Por cada bloque se reportan filas/s y memoria.
+        """
+        table_name = Path(csv_path).stem.lower()
+        start_id = None
+        try:
             
-            # Insertar datos en lotes usando INSERT IGNORE
-            batch_size = 1000
+            # Inferir la estructura de la tabla a partir de una muestra
+            try:
+                sample = self.prepare_dataframe(
+                    pd.read_csv(csv_path, nrows=self.sample_rows, **CSV_READ_OPTIONS)
+                )
+            except Exception as e:
+                logger.error(f"Error leyendo la muestra de {csv_path}: {str(e)}")
+                return False
+            
+            original_columns = list(sample.columns)
+            if not self.create_table_from_df(table_name, sample):
+                return False
+            columns = list(sample.columns)
+            column_names = dict(zip(original_columns, columns))
+            del sample
+            column_types = self.get_column_types(table_name)
+            # Las filas de esta carga son las de id mayor, para borrarlas si se aborta
+            self.cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM `{table_name}`")
+            start_id = self.cursor.fetchone()[0]
+            
+            logger.info(f"Cargando {csv_path} por bloques de {self.chunksize} filas")
+            total_registros = 0
             registros_insertados = 0
-            registros_duplicados = 0
+            start = time.perf_counter()
             
-            for i in range(0, len(df), batch_size):
+            reader = pd.read_csv(csv_path, chunksize=self.chunksize, **CSV_READ_OPTIONS)
+            for chunk_number, chunk in enumerate(reader, start=1):
+                chunk_start = time.perf_counter()
+                chunk = self.prepare_dataframe(chunk).rename(columns=column_names)
+                chunk_memory = chunk.memory_usage(deep=True).sum() / 1024 / 1024
+                self.adapt_columns(table_name, chunk, column_types)
+                
                 try:
-                    batch = df.iloc[i:i + batch_size]
-                    # Convertir el batch a una lista de tuplas, reemplazando NaN por None
-                    values = [tuple(None if pd.isna(x) else x for x in row) for row in batch.values]
-                    
-                    # Usar INSERT IGNORE para saltar duplicados
-                    insert_sql = f"""
-                    INSERT IGNORE INTO `{table_name}` 
-                    (`{'`, `'.join(columns)}`) 
-                    VALUES ({placeholders})
-                    """
-                    
-                    self.cursor.executemany(insert_sql, values)
-                    self.conn.commit()
-                    
-                    # Contar registros insertados vs duplicados
-                    registros_insertados += self.cursor.rowcount
-                    registros_duplicados = len(batch) - self.cursor.rowcount
-                    
-                    logger.info(f"Procesado lote {i//batch_size + 1} de {len(df)//batch_size + 1}")
+                    insertados = self.write_dataframe(
+                        table_name, chunk, columns, log_batches=False, raise_errors=True
+                    )
                 except Exception as e:
-                    logger.error(f"Error insertando lote {i//batch_size + 1}: {str(e)}")
-                    continue
-
+                    logger.error(
+                        f"Bloque {chunk_number} de {csv_path} rechazado, carga abortada "
+                        f"tras {total_registros} filas: {str(e)}"
+                    )
+                    self.discard_partial_load(table_name, start_id)
+                    return False
+                total_registros += len(chunk)
+                registros_insertados += insertados
+                
+                chunk_time = time.perf_counter() - chunk_start
+                elapsed = time.perf_counter() - start
+                peak = peak_memory_mb()
+                logger.info(
+                    f"Bloque {chunk_number}: {len(chunk)} filas en {chunk_time:.1f}s "
+                    f"({len(chunk) / chunk_time:.0f} filas/s, acumulado {total_registros / elapsed:.0f} filas/s), "
+                    f"bloque {chunk_memory:.1f} MB"
+                    + (f", pico del proceso {peak:.0f} MB" if peak is not None else "")
+                )
+            
+            elapsed = time.perf_counter() - start
             logger.info(f"""
-            Archivo {csv_path} procesado:
+            Archivo {csv_path} procesado por bloques:
             - Total registros en archivo: {total_registros}
             - Registros nuevos insertados: {registros_insertados}
             - Registros duplicados omitidos: {total_registros - registros_insertados}
+            - Tiempo: {elapsed:.1f}s ({total_registros / elapsed if elapsed else 0:.0f} filas/s)
             """)
+            self.file_rows[csv_path] = total_registros
+            self.update_row_count(table_name)
+            # Invalidar perfiles y resultados cacheados por la app
+            touch_invalidation_marker("data")
             return True
 
         except Exception as e:
             logger.error(f"Error cargando archivo {csv_path}: {str(e)}")
+            if start_id is not None:
+                self.discard_partial_load(table_name, start_id)
             return False
 
-    def process_directory(self, directory: str = 'data'):
-        """Procesa todos los archivos CSV en un directorio"""
+    def discard_partial_load(self, table_name: str, start_id: int):
+        """
+        Borra las filas que una carga por bloques abortada ya había confirmado
+        (id mayor que start_id), para que reintentarla no las duplique, y
+        actualiza el conteo y las cachés de la app
+        """
+        try:
+            self.conn.rollback()
+            self.cursor.execute(f"DELETE FROM `{table_name}` WHERE id > %s", (start_id,))
+            self.conn.commit()
+            logger.warning(f"Carga abortada: {self.cursor.rowcount} filas parciales borradas de {table_name}")
+        except Error as e:
+            logger.error(
+                f"No se pudieron borrar las filas parciales de {table_name} (id > {start_id}); "
+                f"bórrelas antes de reintentar: {str(e)}"
+            )
+        self.update_row_count(table_name)
+        touch_invalidation_marker("data")
+
+    def process_directory(self, directory: str = 'data', workers: int = 1):
+        """
+        Procesa todos los archivos CSV en un directorio
+        
+        Args:
+            directory (str): Directorio relativo a la raíz del proyecto
+            workers (int): Procesos para cargar varios archivos en paralelo
+        """
         try:
             # Obtener ruta raíz del proyecto (2 niveles arriba de scripts/mysql)
             root_path = Path(__file__).parent.parent.parent
@@ -263,40 +543,106 @@ class CSVLoader:
                 logger.warning(f"No se encontraron archivos CSV en {data_dir}")
                 return
 
-            # Conectar a la base de datos
-            if not self.connect():
-                return
-
-            # Procesar cada archivo
-            successful = 0
-            failed = 0
-            
-            for csv_file in csv_files:
-                csv_path = os.path.join(data_dir, csv_file)
-                if self.load_csv_to_table(csv_path):
-                    successful += 1
-                else:
-                    failed += 1
+            csv_paths = [os.path.join(data_dir, csv_file) for csv_file in csv_files]
+            start = time.perf_counter()
+            if workers > 1:
+                results = self.load_files_parallel(csv_paths, workers)
+            else:
+                results = self.load_files_sequential(csv_paths)
+            elapsed = time.perf_counter() - start
 
+            successful = sum(1 for _, ok, _, _ in results if ok)
+            failed = len(results) - successful
+            total_rows = sum(rows for _, _, rows, _ in results)
             logger.info(f"""
             Resumen del proceso:
             - Archivos procesados exitosamente: {successful}
             - Archivos con errores: {failed}
             - Total de archivos: {len(csv_files)}
+            - Registros leídos: {total_rows}
+            - Tiempo total: {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.0f} filas/s, {workers} worker(s))
             """)
 
         except Exception as e:
             logger.error(f"Error en el proceso: {str(e)}")
+
+    def load_files_sequential(self, csv_paths: List[str]) -> List[Tuple[str, bool, int, float]]:
+        """Carga los archivos uno tras otro sobre una sola conexión"""
+        results = []
+        if not self.connect():
+            return [(csv_path, False, 0, 0.0) for csv_path in csv_paths]
+        try:
+            for index, csv_path in enumerate(csv_paths, start=1):
+                start = time.perf_counter()
+                ok = self.load_csv_to_table(csv_path)
+                result = (csv_path, ok, self.file_rows.get(csv_path, 0), time.perf_counter() - start)
+                log_file_progress(result, index, len(csv_paths))
+                results.append(result)
         finally:
-            if self.cursor:
-                self.cursor.close()
-            if self.conn and self.conn.is_connected():
-                self.conn.close()
-                logger.info("Conexión cerrada")
+            self.close()
+        return results
+
+    def load_files_parallel(self, csv_paths: List[str], workers: int) -> List[Tuple[str, bool, int, float]]:
+        """
+        Carga los archivos en un pool de procesos: cada worker lee, limpia e
+        inserta un archivo completo con su propia conexión
+        """
+        logger.info(f"Cargando {len(csv_paths)} archivos con {workers} procesos")
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(load_file_worker, csv_path, self.chunksize, self.sample_rows, self.bulk): csv_path
+                for csv_path in csv_paths
+            }
+            for index, future in enumerate(as_completed(futures), start=1):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Error en el worker de {futures[future]}: {str(e)}")
+                    result = (futures[future], False, 0, 0.0)
+                log_file_progress(result, index, len(csv_paths))
+                results.append(result)
+        return results
+
+def log_file_progress(result: Tuple[str, bool, int, float], index: int, total: int):
+    csv_path, ok, rows, seconds = result
+    status = f"{rows} filas en {seconds:.1f}s ({rows / seconds if seconds else 0:.0f} filas/s)" if ok else "con errores"
+    logger.info(f"[{index}/{total}] {Path(csv_path).name}: {status}")
+
+def load_file_worker(csv_path: str, chunksize: Optional[int], sample_rows: int,
+                     bulk: bool) -> Tuple[str, bool, int, float]:
+    """Carga un archivo dentro de un proceso del pool, con su propia conexión"""
+    loader = CSVLoader(chunksize=chunksize, sample_rows=sample_rows, bulk=bulk)
+    start = time.perf_counter()
+    try:
+        ok = loader.connect() and loader.load_csv_to_table(csv_path)
+    finally:
+        loader.close()
+    return csv_path, ok, loader.file_rows.get(csv_path, 0), time.perf_counter() - start
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Carga los CSV de Perú Compras a MySQL")
+    parser.add_argument("--directory", default="data", help="Directorio con los CSV, relativo a la raíz")
+    parser.add_argument("--stream", action="store_true",
+                        help="Leer y cargar por bloques con memoria acotada (para archivos grandes)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="Filas por bloque en modo --stream")
+    parser.add_argument("--sample-rows", type=int, default=DEFAULT_SAMPLE_ROWS,
+                        help="Filas usadas para inferir los tipos en modo --stream")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Cargar con LOAD DATA LOCAL INFILE (requiere local_infile=ON en el servidor)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos para cargar varios archivos en paralelo, cada uno con su conexión")
+    return parser.parse_args()
 
 def main():
-    loader = CSVLoader()
-    loader.process_directory()
+    args = parse_args()
+    loader = CSVLoader(
+        chunksize=args.chunksize if args.stream else None,
+        sample_rows=args.sample_rows,
+        bulk=args.bulk
+    )
+    loader.process_directory(args.directory, workers=args.workers)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,9 +6,20 @@ import numpy as np
 import mysql.connector
 from datetime import datetime
 from typing import Dict, List, Tuple, Any
+import time
 import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 from dotenv import load_dotenv
 
+root_path = Path(__file__).parent.parent.parent.parent
+sys.path.append(str(root_path))
+
+from src.utils.cache import touch_invalidation_marker
+from src.utils.table_stats import update_table_stats
+from src.utils.bulk_load import bulk_load_dataframe, LocalInfileUnavailable
+
 class DataValidator:
     """Clase para validación y limpieza de datos"""
     
@@ -68,13 +79,41 @@ class DataValidator:
             return 'TEXT', valid_percentage
         return 'TEXT', 100.0
 
+    @staticmethod
+    def convert_column(series: pd.Series, sql_type: str) -> pd.Series:
+        """
+        Convierte una columna al tipo inferido, para que LOAD DATA reciba
+        números y fechas ya parseados en lugar del texto original
+        
+        Raises:
+            ValueError: Si algún valor no se puede convertir
+        """
+        if sql_type in ('INT', 'BIGINT', 'DOUBLE'):
+            converted = pd.to_numeric(series, errors='coerce')
+        elif sql_type == 'DATETIME':
+            date_format = DataValidator.detect_date_format(series)
+            converted = pd.to_datetime(series, format=date_format, errors='coerce')
+        else:
+            return series
+        invalid = converted.isna() & series.notna()
+        if invalid.any():
+            raise ValueError(
+                f"{invalid.sum()} valores de {series.name} no se pueden convertir a {sql_type}, "
+                f"p. ej. {series[invalid].iloc[0]!r}"
+            )
+        return converted
+
 class CSVLoader:
     """Clase principal para cargar CSVs a MySQL"""
     
-    def __init__(self, config: Dict[str, str]):
-        self.config = config
+    def __init__(self, config: Dict[str, str], bulk: bool = False):
+        # bulk: cargar con LOAD DATA LOCAL INFILE, con inserciones por lotes como respaldo
+        self.config = {**config, 'allow_local_infile': bulk}
+        self.bulk = bulk
         self.setup_logging()
         self.validator = DataValidator()
+        # Registros insertados por archivo, para el resumen de throughput
+        self.file_rows: Dict[str, int] = {}
         self.connection = None
         self.cursor = None
 
@@ -143,6 +182,8 @@ class CSVLoader:
         
         self.cursor.execute(f"DROP TABLE IF EXISTS `{table_name}`")
         self.cursor.execute(create_table_query)
+        # Avisar a la app que el esquema cambió para invalidar su cache
+        touch_invalidation_marker("schema")
         self.logger.info(f"Tabla '{table_name}' creada exitosamente")
 
     def attempt_csv_read(self, file_path: str) -> Tuple[pd.DataFrame, dict]:
@@ -254,36 +295,79 @@ class CSVLoader:
             clean_columns = [info['clean_name'] for info in column_info.values()]
             df.columns = clean_columns
             
-            # Insertar datos por lotes
-            batch_size = 1000
-            total_inserted = 0
-            
-            # Preparar la consulta de inserción
-            placeholders = ', '.join(['%s'] * len(clean_columns))
-            insert_query = f"INSERT INTO `{table_name}` ({', '.join(f'`{col}`' for col in clean_columns)}) VALUES ({placeholders})"
-            
-            for i in range(0, len(df), batch_size):
-                try:
-                    batch = df.iloc[i:i + batch_size]
-                    values = [tuple(row) for _, row in batch.iterrows()]
-                    self.cursor.executemany(insert_query, values)
-                    self.connection.commit()
-                    total_inserted += len(batch)
-                    self.logger.info(f"Insertados {total_inserted} de {len(df)} registros...")
-                except Exception as e:
-                    self.logger.error(f"Error en el lote {i}-{i+batch_size}: {e}")
-                    self.connection.rollback()
-                    continue
+            # Insertar datos con LOAD DATA o por lotes
+            sql_types = [info['sql_type'] for info in column_info.values()]
+            total_inserted = self.insert_rows(table_name, df, clean_columns, sql_types)
 
             self.logger.info(f"Importación completada. Total de registros insertados: {total_inserted}")
+            self.file_rows[file_path] = total_inserted
+            try:
+                # Conteo exacto para la app, sin COUNT(*) por pregunta
+                update_table_stats(self.cursor, table_name)
+                self.connection.commit()
+            except Exception as e:
+                self.logger.warning(f"No se pudo actualizar el conteo de filas de {table_name}: {e}")
+            # Invalidar perfiles y resultados cacheados por la app
+            touch_invalidation_marker("data")
             return True
             
         except Exception as e:
             self.logger.error(f"Error al cargar {file_path}: {str(e)}")
             return False
 
-    def process_directory(self, directory: str):
-        """Procesa todos los CSVs en un directorio"""
+    def insert_rows(self, table_name: str, df: pd.DataFrame, clean_columns: List[str],
+                    sql_types: List[str]) -> int:
+        """
+        Inserta el DataFrame con LOAD DATA LOCAL INFILE si está activo, o por lotes
+        
+        Para LOAD DATA las columnas se convierten antes a sus tipos inferidos;
+        si no se puede, o MySQL avisa de valores convertidos, se usan las
+        inserciones por lotes, que fallan por lote con el valor inválido.
+        """
+        if self.bulk:
+            try:
+                typed = pd.DataFrame({
+                    col: self.validator.convert_column(df[col], sql_type)
+                    for col, sql_type in zip(clean_columns, sql_types)
+                })
+                total_inserted = bulk_load_dataframe(self.connection, self.cursor, table_name, typed, clean_columns)
+                self.logger.info(f"Carga masiva completada: {total_inserted} registros")
+                return total_inserted
+            except LocalInfileUnavailable as e:
+                # No reintentar con los siguientes archivos
+                self.bulk = False
+                self.logger.warning(f"LOAD DATA LOCAL INFILE no permitido ({e}), usando inserciones por lotes")
+            except (ValueError, mysql.connector.Error) as e:
+                self.logger.warning(f"Error en la carga masiva de {table_name} ({e}), usando inserciones por lotes")
+
+        batch_size = 1000
+        total_inserted = 0
+        
+        # Preparar la consulta de inserción
+        placeholders = ', '.join(['%s'] * len(clean_columns))
+        insert_query = f"INSERT INTO `{table_name}` ({', '.join(f'`{col}`' for col in clean_columns)}) VALUES ({placeholders})"
+        
+        for i in range(0, len(df), batch_size):
+            try:
+                batch = df.iloc[i:i + batch_size]
+                values = [tuple(row) for _, row in batch.iterrows()]
+                self.cursor.executemany(insert_query, values)
+                self.connection.commit()
+                total_inserted += len(batch)
+                self.logger.info(f"Insertados {total_inserted} de {len(df)} registros...")
+            except Exception as e:
+                self.logger.error(f"Error en el lote {i}-{i+batch_size}: {e}")
+                self.connection.rollback()
+                continue
+        return total_inserted
+
+    def process_directory(self, directory: str, workers: int = 1):
+        """
+        Procesa todos los CSVs en un directorio
+        
+        Con workers > 1 cada archivo se carga en un proceso del pool con su
+        propia conexión; si no, se usa la conexión de este loader.
+        """
         if not os.path.isdir(directory):
             self.logger.error(f"El directorio {directory} no existe")
             return
@@ -293,23 +377,64 @@ class CSVLoader:
             self.logger.warning("No se encontraron archivos CSV")
             return
         
-        successful_loads = 0
-        failed_loads = 0
+        full_paths = [os.path.join(directory, csv_file) for csv_file in csv_files]
+        results = []
+        start = time.perf_counter()
+        
+        if workers > 1:
+            self.logger.info(f"Cargando {len(full_paths)} archivos con {workers} procesos")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(load_file_worker, full_path, self.config, self.bulk): full_path
+                    for full_path in full_paths
+                }
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        self.logger.error(f"Error en el worker de {futures[future]}: {e}")
+                        results.append((futures[future], False, 0, 0.0))
+                    self.log_progress(results[-1], len(results), len(full_paths))
+        else:
+            for full_path in full_paths:
+                file_start = time.perf_counter()
+                ok = self.load_csv(full_path)
+                results.append((full_path, ok, self.file_rows.get(full_path, 0), time.perf_counter() - file_start))
+                self.log_progress(results[-1], len(results), len(full_paths))
         
-        for csv_file in csv_files:
-            full_path = os.path.join(directory, csv_file)
-            if self.load_csv(full_path):
-                successful_loads += 1
-            else:
-                failed_loads += 1
+        elapsed = time.perf_counter() - start
+        successful_loads = sum(1 for _, ok, _, _ in results if ok)
+        failed_loads = len(results) - successful_loads
+        total_rows = sum(rows for _, _, rows, _ in results)
         
         self.logger.info(f"""
         Resumen de procesamiento:
         - CSVs procesados exitosamente: {successful_loads}
         - CSVs con errores: {failed_loads}
         - Total de archivos: {len(csv_files)}
+        - Registros insertados: {total_rows}
+        - Tiempo total: {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.0f} registros/s, {workers} worker(s))
         """)
 
+    def log_progress(self, result: Tuple[str, bool, int, float], index: int, total: int):
+        file_path, ok, rows, seconds = result
+        status = f"{rows} registros en {seconds:.1f}s" if ok else "con errores"
+        self.logger.info(f"[{index}/{total}] {os.path.basename(file_path)}: {status}")
+
+def load_file_worker(file_path: str, config: Dict[str, str], bulk: bool) -> Tuple[str, bool, int, float]:
+    """Carga un archivo dentro de un proceso del pool, con su propia conexión"""
+    loader = CSVLoader(config, bulk=bulk)
+    start = time.perf_counter()
+    try:
+        loader.connect_to_database()
+        ok = loader.load_csv(file_path)
+    finally:
+        if loader.cursor:
+            loader.cursor.close()
+        if loader.connection:
+            loader.connection.close()
+    return file_path, ok, loader.file_rows.get(file_path, 0), time.perf_counter() - start
+
 def main():
     # Cargar variables de entorno
     load_dotenv()
@@ -321,10 +446,19 @@ def main():
         'database': os.getenv('MYSQL_DATABASE')
     }
     
-    loader = CSVLoader(config)
+    parser = argparse.ArgumentParser(description="Carga CSVs de formato variable a MySQL")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Cargar con LOAD DATA LOCAL INFILE (requiere local_infile=ON en el servidor)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Procesos para cargar varios archivos en paralelo, cada uno con su conexión")
+    args = parser.parse_args()
+    
+    loader = CSVLoader(config, bulk=args.bulk)
     try:
-        loader.connect_to_database()
-        loader.process_directory('data')
+        # En modo paralelo cada worker abre su propia conexión
+        if args.workers <= 1:
+            loader.connect_to_database()
+        loader.process_directory('data', workers=args.workers)
     finally:
         if loader.cursor:
             loader.cursor.close()
@@ -0,0 +1,184 @@
+# run_questions.py
+"""
+Ejecuta un archivo de preguntas a través de QueryProcessor sin Streamlit.
+
+Sirve para calentar las cachés (esquema, resultados, SQL semántico) y para
+comparar modelos o prompts. Cada pregunta se escribe como una línea JSON con
+el SQL, el resultado, los tiempos y el consumo de tokens; los spans de
+cada pregunta se exportan a --trace-output.
+
+Uso:
+    python scripts/run_questions.py preguntas.txt --tables tabla1,tabla2 --workers 4
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List
+
+root_path = Path(__file__).parent.parent
+sys.path.append(str(root_path))
+
+from langchain_community.callbacks import get_openai_callback
+from config.config import OPENAI_API_KEY, DEFAULT_PROVIDER, DEFAULT_TEMPERATURE, get_default_model
+from src.utils.context import RequestContext
+from src.utils.tracing import start_trace, span, export_records
+from src.utils.database import get_all_tables, get_ignored_tables
+from src.utils.chatbot.chains import ChainBuilder
+from src.utils.chatbot.query import QueryProcessor
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(),
+        logging.FileHandler('run_questions.log')
+    ]
+)
+logger = logging.getLogger(__name__)
+
+def load_questions(path: Path) -> List[Dict[str, Any]]:
+    """
+    Lee las preguntas de un archivo de texto (una por línea) o JSONL
+    (objetos con "question" y opcionalmente "tables")
+    """
+    questions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if path.suffix == '.jsonl':
+                questions.append(json.loads(line))
+            else:
+                questions.append({"question": line})
+    return questions
+
+def build_context(args: argparse.Namespace) -> RequestContext:
+    """Contexto de la pregunta, sin RAG (requiere memoria de conversación)"""
+    return RequestContext(
+        provider=args.provider,
+        model_name=args.model or get_default_model(args.provider),
+        temperature=args.temperature,
+        openai_api_key=OPENAI_API_KEY
+    )
+
+def run_question(item: Dict[str, Any], tables: List[str], args: argparse.Namespace) -> Dict[str, Any]:
+    """Procesa una pregunta con su propio contexto y devuelve el registro a escribir"""
+    question = item["question"]
+    tables = item.get("tables", tables)
+    start = time.perf_counter()
+    context = build_context(args)
+    # Modelo efectivo: el de --model o el por defecto del proveedor
+    record = {"question": question, "tables": tables, "provider": context.provider, "model": context.model_name}
+    trace = start_trace("batch_question", question=question, tables=tables)
+    with get_openai_callback() as tokens, trace.activate():
+        try:
+            prepared = QueryProcessor.prepare_query_context(question, tables, context)
+            prepared_at = time.perf_counter()
+            with span("answer.generate"):
+                answer = ChainBuilder.build_answer_chain(context).invoke(prepared["context"])
+            response = QueryProcessor.finalize_response(prepared, answer)
+            finished_at = time.perf_counter()
+
+            result = prepared["context"]["result"]
+            record.update({
+                "query": prepared["query"],
+                "sql_cache_hit": prepared["sql_cache_hit"],
+                "columns": result["columns"],
+                "rows": result["rows"][:args.max_rows],
+                "row_count": result["row_count"],
+                "truncated": result["truncated"],
+                "answer": response.get("response"),
+                "timings": {
+                    "prepare_s": round(prepared_at - start, 3),
+                    "answer_s": round(finished_at - prepared_at, 3),
+                    "total_s": round(finished_at - start, 3)
+                },
+                "error": None
+            })
+        except Exception as e:
+            logger.error(f"Error procesando '{question}': {str(e)}")
+            record.update({
+                "timings": {"total_s": round(time.perf_counter() - start, 3)},
+                "error": str(e)
+            })
+
+        # Duración por etapa (ms), sumando las etapas repetidas
+        spans = trace.finish()
+        if args.trace_output:
+            export_records(spans, args.trace_output)
+        stages = {}
+        for record_span in spans:
+            if record_span["parent_span_id"]:
+                name = record_span["name"]
+                stages[name] = round(stages.get(name, 0) + record_span["duration_ms"], 3)
+        record["stages_ms"] = stages
+        # Tokens de la traza (cualquier proveedor); el callback de OpenAI solo aporta el costo
+        root_attributes = spans[0]["attributes"]
+        record["tokens"] = {
+            "prompt": root_attributes.get("llm.prompt_tokens", 0),
+            "completion": root_attributes.get("llm.completion_tokens", 0),
+            "total": root_attributes.get("llm.total_tokens", 0),
+            "cost_usd": round(tokens.total_cost, 6)
+        }
+    return record
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ejecuta preguntas en lote contra Khipu AI sin la interfaz")
+    parser.add_argument("questions", type=Path, help="Archivo .txt (una pregunta por línea) o .jsonl")
+    parser.add_argument("--tables", default="", help="Tablas separadas por coma (por defecto todas las no ignoradas)")
+    parser.add_argument("--output", type=Path, default=Path("run_questions_results.jsonl"), help="Archivo JSONL de salida")
+    parser.add_argument("--workers", type=int, default=4, help="Preguntas procesadas en paralelo")
+    parser.add_argument("--provider", default=DEFAULT_PROVIDER, choices=["openai", "ollama"])
+    parser.add_argument("--model", default=None, help="Modelo a usar (por defecto el del proveedor)")
+    parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE)
+    parser.add_argument("--max-rows", type=int, default=20, help="Filas del resultado a guardar por pregunta")
+    parser.add_argument("--trace-output", default="run_questions_traces.jsonl",
+                        help="Archivo JSONL con los spans de cada pregunta (vacío para no exportarlos)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    questions = load_questions(args.questions)
+    if not questions:
+        logger.warning(f"No se encontraron preguntas en {args.questions}")
+        return
+
+    if args.tables:
+        tables = [table.strip() for table in args.tables.split(',') if table.strip()]
+    else:
+        ignored = get_ignored_tables()
+        tables = [table for table in get_all_tables() if table not in ignored]
+
+    logger.info(f"Procesando {len(questions)} preguntas con {args.workers} workers sobre {len(tables)} tablas")
+    start = time.perf_counter()
+    completed, failed, total_tokens = 0, 0, 0
+
+    with open(args.output, 'w', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run_question, item, tables, args) for item in questions]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            completed += 1
+            failed += record["error"] is not None
+            total_tokens += record["tokens"]["total"]
+            logger.info(f"[{completed}/{len(questions)}] {record['timings']['total_s']}s - {record['question']}")
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"""
+    Resumen:
+    - Preguntas procesadas: {completed}
+    - Con errores: {failed}
+    - Tiempo total: {elapsed:.1f}s ({completed / elapsed:.2f} preguntas/s)
+    - Tokens totales: {total_tokens}
+    - Resultados en: {args.output}
+    """)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,106 @@
 # src/components/debug_panel.py
 import streamlit as st
+import matplotlib.pyplot as plt
+import pandas as pd
 import logging
+from typing import Any, Dict, List
+from src.utils.database import get_schema_cache_stats, get_result_cache_stats, get_pool_metrics
+from src.utils.profiling import TableProfiler
+from src.utils.rag_utils import get_embedding_cache_stats
+from src.utils.chatbot.semantic_cache import SemanticQueryCache
+from src.utils.llm_provider import LLMProvider
+from src.utils.chatbot.insights import InsightGenerator
+
+def display_cache_stats():
+    """Display hit/miss statistics of the shared caches"""
+    try:
+        stats = [
+            get_schema_cache_stats(),
+            get_result_cache_stats(),
+            TableProfiler.get_cache_stats(),
+            get_embedding_cache_stats(),
+            SemanticQueryCache.stats(),
+            InsightGenerator.get_cache_stats(),
+            LLMProvider.get_registry_stats()
+        ]
+        with st.expander("Cache Statistics", expanded=False):
+            st.dataframe(pd.DataFrame(stats), hide_index=True)
+    except Exception as e:
+        logging.error(f"Error displaying cache statistics: {str(e)}")
+
+def display_pool_metrics():
+    """Display checkout, wait time and exhaustion metrics of the connection pool"""
+    try:
+        with st.expander("Connection Pool", expanded=False):
+            st.json(get_pool_metrics())
+    except Exception as e:
+        logging.error(f"Error displaying pool metrics: {str(e)}")
+
+def _span_depths(spans: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Nesting level of each span, from its parent chain"""
+    parents = {span["span_id"]: span["parent_span_id"] for span in spans}
+    depths = {}
+    for span_id in parents:
+        depth, parent = 0, parents[span_id]
+        while parent in parents:
+            depth, parent = depth + 1, parents[parent]
+        depths[span_id] = depth
+    return depths
+
+def display_trace_waterfall(spans: List[Dict[str, Any]]):
+    """
+    Display the spans of a query as a waterfall chart and a table
+    
+    Parameters:
+    -----------
+    spans : List[Dict[str, Any]]
+        Span records of one trace, as returned by Trace.finish
+    """
+    try:
+        if not spans:
+            return
+        start = min(span["start_time_unix_nano"] for span in spans)
+        depths = _span_depths(spans)
+        labels = ["  " * depths[span["span_id"]] + span["name"] for span in spans]
+        offsets = [(span["start_time_unix_nano"] - start) / 1e6 for span in spans]
+        durations = [span["duration_ms"] for span in spans]
+        colors = ['#e74c3c' if span["status"]["code"] == "ERROR" else '#3498db' for span in spans]
+        
+        fig, ax = plt.subplots(figsize=(10, 0.4 * len(spans) + 1))
+        ax.barh(range(len(spans)), durations, left=offsets, color=colors)
+        for idx, span in enumerate(spans):
+            # Tokens junto a la duración para las etapas con LLM
+            tokens = span["attributes"].get("llm.total_tokens")
+            label = f"{span['duration_ms']:.0f} ms" + (f" · {tokens} tokens" if tokens else "")
+            ax.text(offsets[idx] + durations[idx], idx, f" {label}", va='center', fontsize=8)
+        ax.set_yticks(range(len(spans)))
+        ax.set_yticklabels(labels, fontsize=9, family='monospace')
+        ax.invert_yaxis()
+        ax.set_xlabel('ms desde el inicio de la consulta')
+        ax.grid(axis='x', alpha=0.3)
+        plt.tight_layout()
+        st.pyplot(fig)
+        plt.close(fig)
+        
+        st.dataframe(pd.DataFrame([
+            {
+                "stage": label,
+                "start_ms": round(offset, 1),
+                "duration_ms": span["duration_ms"],
+                "status": span["status"]["code"],
+                **span["attributes"]
+            }
+            for label, offset, span in zip(labels, offsets, spans)
+        ]), hide_index=True)
+    except Exception as e:
+        logging.error(f"Error displaying trace waterfall: {str(e)}")
 
 def display_debug_section():
     """Display debug information in a separate section"""
     try:
         st.header("Debug Information")
+        display_cache_stats()
+        display_pool_metrics()
         
         # Asegurar que debug_logs existe
         if 'debug_logs' not in st.session_state:
@@ -14,7 +109,8 @@ def display_debug_section():
         if st.session_state['debug_logs']:
             for idx, log in enumerate(st.session_state['debug_logs'], 1):
                 with st.expander(f"Debug Log {idx}", expanded=False):
-                    st.json(log)
+                    display_trace_waterfall(log.get('trace', []))
+                    st.json({key: value for key, value in log.items() if key != 'trace'})
         else:
             st.info("No debug logs available yet. Make some queries to see the debug information.")
     except Exception as e:
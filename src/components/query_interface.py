@@ -1,12 +1,16 @@
 # src/components/query_interface.py
 import streamlit as st
 import pandas as pd
-from src.services.data_processing import handle_query_and_response
+from src.services.data_processing import (
+    handle_query_and_response, prepare_streaming_query, stream_answer, finish_streaming_query,
+    fail_streaming_query
+)
 from src.components.visualization import create_visualization
-from src.utils.database import get_all_tables
+from src.utils.database import get_all_tables, result_to_dataframe
+from src.utils.chatbot.response import ResponseProcessor
 from typing import List
 from src.utils.llm_provider import LLMProvider
-from config.config import get_default_model
+from config.config import get_default_model, STREAM_RESPONSES
 
 def display_model_settings():
     """Display model settings in sidebar"""
@@ -98,8 +102,51 @@ def display_table_selection() -> List[str]:
         st.sidebar.error(f"Error in table selection: {str(e)}")
         return []
 
+def display_visualization(visualization_data):
+    """Display the visualization of a response"""
+    if visualization_data:
+        with st.expander("📊 Data Visualization", expanded=True):
+            df = pd.DataFrame(visualization_data)
+            create_visualization(df)
+
+def display_rag_sections(response: dict):
+    """Display the knowledge base and RAG context sections of a response"""
+    # RAG Documents Overview
+    if response.get('loaded_documents'):
+        docs_expander = st.expander("📚 Available Knowledge Base", expanded=False)
+        with docs_expander:
+            st.markdown("The following documents are available for analysis:")
+            for doc_info in response['loaded_documents']:
+                st.markdown(doc_info)
+
+    # RAG Context section
+    if response.get('documents_used'):
+        rag_expander = st.expander("🔍 Knowledge Sources Used", expanded=False)
+        with rag_expander:
+            st.markdown("### Documents Used for Analysis")
+            for source, info in response['documents_used'].items():
+                st.markdown(f"""
+**Document:** {source}
+- Type: {info['type']}
+- Chunks used: {info['chunks']}
+""")
+            st.markdown("### Relevant Context")
+            for ctx in response.get('rag_context', []):
+                st.markdown("---")
+                st.markdown(f"```\n{ctx[:300]}...\n```")
+
+def add_to_history(response: dict):
+    """Add a response to the session history"""
+    if 'history' not in st.session_state:
+        st.session_state['history'] = []
+    st.session_state['history'].append(response)
+
 def process_query(question: str, selected_tables: List[str]):
     """Process a query and display results"""
+    if STREAM_RESPONSES:
+        process_query_streaming(question, selected_tables)
+        return
+    
     with st.spinner('Processing your question...'):
         try:
             response = handle_query_and_response(question, selected_tables)
@@ -116,11 +163,7 @@ def process_query(question: str, selected_tables: List[str]):
                     results_container = st.container()
                     with results_container:
                         # Visualization section
-                        if response.get('visualization_data'):
-                            viz_expander = st.expander("📊 Data Visualization", expanded=True)
-                            with viz_expander:
-                                df = pd.DataFrame(response['visualization_data'])
-                                create_visualization(df)
+                        display_visualization(response.get('visualization_data'))
                         
                         # SQL Query section
                         if response.get('query'):
@@ -128,39 +171,78 @@ def process_query(question: str, selected_tables: List[str]):
                             with sql_expander:
                                 st.code(response.get('query', ''), language='sql')
 
-                        # RAG Documents Overview
-                        if response.get('loaded_documents'):
-                            docs_expander = st.expander("📚 Available Knowledge Base", expanded=False)
-                            with docs_expander:
-                                st.markdown("The following documents are available for analysis:")
-                                for doc_info in response['loaded_documents']:
-                                    st.markdown(doc_info)
-
-                        # RAG Context section
-                        if response.get('documents_used'):
-                            rag_expander = st.expander("🔍 Knowledge Sources Used", expanded=False)
-                            with rag_expander:
-                                st.markdown("### Documents Used for Analysis")
-                                for source, info in response['documents_used'].items():
-                                    st.markdown(f"""
-**Document:** {source}
-- Type: {info['type']}
-- Chunks used: {info['chunks']}
-""")
-                                st.markdown("### Relevant Context")
-                                for ctx in response.get('rag_context', []):
-                                    st.markdown("---")
-                                    st.markdown(f"```\n{ctx[:300]}...\n```")
+                        display_rag_sections(response)
                 
                 # Add to history
-                if 'history' not in st.session_state:
-                    st.session_state['history'] = []
-                st.session_state['history'].append(response)
+                add_to_history(response)
                 
         except Exception as e:
             st.error(f"Error processing query: {str(e)}")
             st.info("Please check your database connection and API keys.")
 
+def process_query_streaming(question: str, selected_tables: List[str]):
+    """
+    Process a query showing SQL, results and visualization as soon as they
+    are ready, then stream the answer token by token
+    """
+    prepared = {}
+    answer_placeholder = None
+    try:
+        with st.spinner('Generating and running the SQL query...'):
+            prepared = prepare_streaming_query(question, selected_tables)
+        
+        if "error_response" in prepared:
+            st.markdown("### Answer")
+            st.write(prepared["error_response"].get('response', ''))
+            add_to_history(prepared["error_response"])
+            return
+        
+        response_container = st.container()
+        with response_container:
+            st.markdown("### Answer")
+            # Espacio reservado arriba de los resultados para la respuesta en streaming
+            answer_placeholder = st.empty()
+            
+            results_container = st.container()
+            with results_container:
+                result = prepared["context"]["result"]
+                visualization_placeholder = st.empty()
+                with visualization_placeholder.container():
+                    # Visualización preliminar a partir de las filas, antes de tener la respuesta
+                    _, early_visualization = ResponseProcessor.process_visualization_data("", result["rows"])
+                    display_visualization(early_visualization)
+                
+                with st.expander("🔍 SQL Query", expanded=False):
+                    st.code(prepared["query"], language='sql')
+                
+                if result["rows"]:
+                    with st.expander(f"📋 Query Results ({result['row_count']} rows)", expanded=False):
+                        st.dataframe(result_to_dataframe(result), hide_index=True)
+            
+            with answer_placeholder.container():
+                answer = st.write_stream(stream_answer(prepared))
+            
+            response = finish_streaming_query(prepared, answer if isinstance(answer, str) else "".join(map(str, answer)))
+            # Reemplazar el texto crudo por la respuesta sin el bloque DATA:
+            answer_placeholder.write(response.get('response', ''))
+            if response.get('visualization_data') != early_visualization:
+                with visualization_placeholder.container():
+                    display_visualization(response.get('visualization_data'))
+            
+            with results_container:
+                display_rag_sections(response)
+        
+        add_to_history(response)
+        
+    except Exception as e:
+        # Fallo a mitad del streaming: cerrar la traza y quitar la respuesta parcial
+        if "trace" in prepared:
+            add_to_history(fail_streaming_query(prepared, e))
+        if answer_placeholder is not None:
+            answer_placeholder.empty()
+        st.error(f"Error processing query: {str(e)}")
+        st.info("Please check your database connection and API keys.")
+
 def display_query_interface():
     """Display the main query interface"""
     # Initialize session states
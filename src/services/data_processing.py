@@ -2,14 +2,17 @@
 import streamlit as st
 import pandas as pd
 import logging
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, Iterator, List, Any
 #from src.utils.chatbot import generate_sql_chain, generate_response_chain
 from src.utils.chatbot.chains import ChainBuilder
 from src.utils.chatbot.query import QueryProcessor
 from src.utils.chatbot.response import ResponseProcessor
+from src.utils.context import RequestContext
+from src.utils.tracing import start_trace
 from src.services.state_management import store_debug_log
 #from src.services.rag_service import process_query_with_rag
 from src.services.rag_service import RAGService
+from config.config import ASYNC_PIPELINE
 
 # Configuración de logging
 logging.basicConfig(
@@ -24,26 +27,107 @@ logger = logging.getLogger(__name__)
 
 # src/services/data_processing.py
 
+def _store_response_log(question: str, selected_tables: List[str], response_data: Dict[str, Any],
+                        trace: Optional[List[Dict[str, Any]]] = None):
+    """Store the debug log entry of a processed query, with its trace spans"""
+    store_debug_log({
+        'timestamp': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'question': question,
+        'query': response_data.get('query'),
+        'full_response': response_data.get('response'),
+        'has_visualization': response_data.get('visualization_data') is not None,
+        'rag_enabled': st.session_state.get('rag_initialized', False),
+        'selected_tables': selected_tables,
+        'rag_context': response_data.get('rag_context', []),
+        'trace': trace or []
+    })
+
+def _store_error_log(question: str, selected_tables: List[str], error: str,
+                     trace: Optional[List[Dict[str, Any]]] = None):
+    """Store the debug log entry of a failed query"""
+    store_debug_log({
+        'timestamp': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'question': question,
+        'error': error,
+        'selected_tables': selected_tables,
+        'trace': trace or []
+    })
+
+def prepare_streaming_query(question: str, selected_tables: List[str]) -> Dict[str, Any]:
+    """
+    Run everything before the final answer so the UI can show results early
+    
+    Returns either a prepared context for stream_answer/finish_streaming_query,
+    or an error response under the "error_response" key. The trace of the
+    query is kept under "trace" until the answer is finished.
+    """
+    trace = start_trace("query", question=question, tables=selected_tables)
+    try:
+        context = RequestContext.from_session()
+        with trace.activate():
+            if ASYNC_PIPELINE:
+                prepared = QueryProcessor.prepare_query_context_async(question, selected_tables, context)
+            else:
+                prepared = QueryProcessor.prepare_query_context(question, selected_tables, context)
+        prepared["trace"] = trace
+        return prepared
+    except Exception as e:
+        logger.error(f"Error preparing query: {str(e)}")
+        _store_error_log(question, selected_tables, str(e), trace.finish())
+        return {
+            "error_response": ResponseProcessor.handle_error_response(
+                question=question,
+                error=str(e),
+                selected_tables=selected_tables
+            )
+        }
+
+def stream_answer(prepared: Dict[str, Any]) -> Iterator[str]:
+    """Stream the final answer tokens of a prepared query"""
+    with prepared["trace"].activate():
+        if ASYNC_PIPELINE:
+            yield from QueryProcessor.stream_answer_async(prepared)
+        else:
+            yield from QueryProcessor.stream_answer(prepared)
+
+def finish_streaming_query(prepared: Dict[str, Any], answer: str) -> Dict[str, Any]:
+    """Format the streamed answer into the usual response dict and log it with its trace"""
+    trace = prepared["trace"]
+    with trace.activate():
+        response_data = QueryProcessor.finalize_response(prepared, answer)
+    _store_response_log(prepared["question"], prepared["selected_tables"], response_data, trace.finish())
+    del prepared["trace"]
+    return response_data
+
+def fail_streaming_query(prepared: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """Finish the trace of a prepared query whose answer failed and log the error"""
+    logger.error(f"Error streaming answer: {str(error)}")
+    trace = prepared.pop("trace")
+    trace.root.set_error(error)
+    _store_error_log(prepared["question"], prepared["selected_tables"], str(error), trace.finish())
+    return ResponseProcessor.handle_error_response(
+        question=prepared["question"],
+        error=str(error),
+        selected_tables=prepared["selected_tables"]
+    )
+
 def handle_query_and_response(question: str, selected_tables: List[str]) -> Dict[str, Any]:
     """Process a query and generate a response"""
+    trace = start_trace("query", question=question, tables=selected_tables)
     try:
         if 'debug_logs' not in st.session_state:
             st.session_state['debug_logs'] = []
             
         # Usar QueryProcessor para manejar toda la lógica de procesamiento
-        response_data = QueryProcessor.process_query_and_response(question, selected_tables)
+        context = RequestContext.from_session()
+        with trace.activate():
+            if ASYNC_PIPELINE:
+                response_data = QueryProcessor.process_query_and_response_async(question, selected_tables, context)
+            else:
+                response_data = QueryProcessor.process_query_and_response(question, selected_tables, context)
         
         # Almacenar en debug_logs
-        store_debug_log({
-            'timestamp': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'question': question,
-            'query': response_data.get('query'),
-            'full_response': response_data.get('response'),
-            'has_visualization': response_data.get('visualization_data') is not None,
-            'rag_enabled': st.session_state.get('rag_initialized', False),
-            'selected_tables': selected_tables,
-            'rag_context': response_data.get('rag_context', [])
-        })
+        _store_response_log(question, selected_tables, response_data, trace.finish())
         
         return response_data
             
@@ -58,11 +142,6 @@ def handle_query_and_response(question: str, selected_tables: List[str]) -> Dict
         )
         
         # Almacenar error en debug_logs
-        store_debug_log({
-            'timestamp': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'question': question,
-            'error': str(e),
-            'selected_tables': selected_tables
-        })
+        _store_error_log(question, selected_tables, str(e), trace.finish())
         
         return error_response
\ No newline at end of file
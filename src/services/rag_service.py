@@ -4,9 +4,10 @@ import logging
 import streamlit as st
 from langchain.memory import ConversationBufferMemory
 from langchain_community.chat_message_histories import StreamlitChatMessageHistory
-from ..utils.rag_utils import initialize_embeddings, load_documents, create_vector_store
+from ..utils.rag_utils import initialize_embeddings, SharedVectorStore
 from ..utils.database import get_all_tables
 from ..utils.chatbot.chains import ChainBuilder
+from ..utils.context import RequestContext
 
 logger = logging.getLogger(__name__)
 
@@ -15,38 +16,30 @@ class RAGService:
     
     @staticmethod
     def initialize_components():
-        """Initialize RAG components in session state"""
-        if 'rag_initialized' not in st.session_state:
+        """
+        Initialize RAG components in session state
+
+        Retried on every rerun until documents are available, so documents
+        added after the first attempt enable RAG without a restart.
+        """
+        if not st.session_state.get('rag_initialized'):
             try:
                 api_key = RAGService._get_api_key()
                 if not api_key:
                     return
                     
+                # Embeddings de esta sesión, con su propia API key
                 embeddings = initialize_embeddings(api_key)
-                documents = RAGService._load_documents()
-                if not documents:
-                    return
-                    
-                # Guardar metadatos de documentos cargados
-                doc_metadata = {}
-                for doc in documents:
-                    source = str(doc.metadata.get('source', 'Unknown'))
-                    if source in doc_metadata:
-                        doc_metadata[source]['chunks'] += 1
-                    else:
-                        doc_metadata[source] = {
-                            'chunks': 1,
-                            'type': source.split('.')[-1].lower()
-                        }
-                
-                st.session_state['loaded_documents'] = doc_metadata
-                logger.info(f"Loaded documents metadata: {doc_metadata}")
-                    
-                vector_store = create_vector_store(documents, embeddings)
+                # El índice es compartido por todas las sesiones; solo la primera lo carga
+                vector_store = SharedVectorStore.initialize(RAGService._get_docs_path(), embeddings)
                 if not vector_store:
+                    if 'rag_initialized' not in st.session_state:
+                        logger.warning("No documents found, RAG will be disabled until documents are added")
+                    st.session_state['rag_initialized'] = False
                     return
                     
-                RAGService._initialize_memory_and_state(vector_store, documents)
+                st.session_state['rag_embeddings'] = embeddings
+                RAGService._initialize_memory_and_state()
                 logger.info("RAG components initialized successfully")
                     
             except Exception as e:
@@ -54,14 +47,20 @@ class RAGService:
                 st.session_state['rag_initialized'] = False
     
     @staticmethod
-    def process_query(question: str, selected_tables: Optional[List[str]] = None) -> Dict:
-        """Process query using RAG enhancement"""
+    def process_query(question: str, request: RequestContext,
+                      selected_tables: Optional[List[str]] = None) -> Dict:
+        """
+        Process query using RAG enhancement
+        
+        Uses the vector store and conversation memory of request, and records
+        the retrieved context and documents used on it.
+        """
         try:
-            if not st.session_state.get('rag_initialized'):
+            if not request.use_rag:
                 return {'question': question, 'error': 'RAG not initialized'}
             
             # Obtener contexto relevante
-            context = RAGService._get_relevant_context(question)
+            context = RAGService._get_relevant_context(question, request.vector_store, request.embeddings)
             
             # Mejorar el tracking de documentos usados
             used_docs = {}
@@ -76,18 +75,20 @@ class RAGService:
                     }
             
             # Guardar metadata de documentos usados
-            st.session_state['last_used_documents'] = used_docs
+            request.used_documents = used_docs
+            request.rag_context = [doc.page_content for doc in context]
             
-            chat_history = RAGService._get_chat_history()
+            chat_history = RAGService._get_chat_history(request.memory)
             
             query = RAGService._generate_enhanced_query(
                 question, 
                 context, 
                 chat_history, 
-                selected_tables
+                selected_tables,
+                request
             )
             
-            RAGService._update_memory(question, query)
+            RAGService._update_memory(request.memory, question, query)
             
             # Incluir información más detallada sobre documentos usados
             doc_usage = []
@@ -102,7 +103,7 @@ Content preview: {next((doc.page_content[:200] + '...' for doc in context if str
             return {
                 'question': question,
                 'query': query,
-                'context_used': [doc.page_content for doc in context],
+                'context_used': request.rag_context,
                 'documents_used': doc_usage,  # Nueva información detallada
                 'chat_history': chat_history
             }
@@ -119,37 +120,23 @@ Content preview: {next((doc.page_content[:200] + '...' for doc in context if str
         """Get OpenAI API key from session state"""
         api_key = st.session_state.get('OPENAI_API_KEY')
         if not api_key:
-            logger.warning("OpenAI API key not found in session state")
+            if 'rag_initialized' not in st.session_state:
+                logger.warning("OpenAI API key not found in session state")
             st.session_state['rag_initialized'] = False
         return api_key
     
     @staticmethod
-    def _load_documents():
-        """Load documents from the docs directory"""
-        try:
-            cwd = Path.cwd()
-            docs_path = Path("docs")
-            if not docs_path.exists():
-                docs_path = cwd / "docs"
-            
-            logger.info(f"Looking for documents in: {docs_path}")
-            documents = load_documents(docs_path)
-            
-            if not documents:
-                logger.warning("No documents found, RAG will be disabled")
-                st.session_state['rag_initialized'] = False
-                return None
-                
-            return documents
-            
-        except Exception as e:
-            logger.error(f"Error loading documents: {e}")
-            st.session_state['rag_initialized'] = False
-            return None
+    def _get_docs_path() -> Path:
+        """Get the path of the docs directory"""
+        docs_path = Path("docs")
+        if not docs_path.exists():
+            docs_path = Path.cwd() / "docs"
+        logger.info(f"Looking for documents in: {docs_path}")
+        return docs_path
     
     @staticmethod
-    def _initialize_memory_and_state(vector_store, documents):
-        """Initialize memory and session state variables"""
+    def _initialize_memory_and_state():
+        """Initialize the per-session conversation memory"""
         msgs = StreamlitChatMessageHistory(key="langchain_messages")
         memory = ConversationBufferMemory(
             chat_memory=msgs,
@@ -157,29 +144,27 @@ Content preview: {next((doc.page_content[:200] + '...' for doc in context if str
             return_messages=True
         )
         
-        st.session_state['vector_store'] = vector_store
         st.session_state['conversation_memory'] = memory
         st.session_state['rag_initialized'] = True
-        st.session_state['docs_loaded'] = [
-            str(doc.metadata.get('source', 'Unknown')) 
-            for doc in documents
-        ]
     
     @staticmethod
-    def _get_relevant_context(question: str):
-        """Get relevant context from vector store"""
-        vector_store = st.session_state.get('vector_store')
-        return vector_store.similarity_search(question, k=3) if vector_store else []
+    def _get_relevant_context(question: str, vector_store, embeddings=None):
+        """Get relevant context from vector store, embedding the question with the session's embeddings"""
+        if not vector_store:
+            return []
+        if embeddings is not None:
+            return vector_store.similarity_search_by_vector(embeddings.embed_query(question), k=3)
+        return vector_store.similarity_search(question, k=3)
     
     @staticmethod
-    def _get_chat_history():
+    def _get_chat_history(memory):
         """Get chat history from memory"""
-        memory = st.session_state.get('conversation_memory')
         return memory.load_memory_variables({}).get('chat_history', '') if memory else ""
     
     @staticmethod
     def _generate_enhanced_query(question: str, context: List, 
-                               chat_history: str, selected_tables: Optional[List[str]]) -> str:
+                               chat_history: str, selected_tables: Optional[List[str]],
+                               request: RequestContext) -> str:
         """Generate enhanced SQL query using context"""
         enhanced_prompt = f"""
         Based on:
@@ -191,16 +176,15 @@ Content preview: {next((doc.page_content[:200] + '...' for doc in context if str
         Generate an appropriate SQL query using only the selected tables.
         """
         
-        sql_chain = ChainBuilder.build_sql_chain()
+        sql_chain = ChainBuilder.build_sql_chain(request)
         return sql_chain.invoke({
             "question": enhanced_prompt,
             "selected_tables": selected_tables
         })
     
     @staticmethod
-    def _update_memory(question: str, query: str):
+    def _update_memory(memory, question: str, query: str):
         """Update conversation memory"""
-        memory = st.session_state.get('conversation_memory')
         if memory:
             memory.save_context(
                 {"question": question},
@@ -0,0 +1,90 @@
+# src/utils/async_runtime.py
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+# Elementos leídos por adelantado en iterate antes de esperar al consumidor
+ITERATE_BUFFER_SIZE = 64
+
+class AsyncRuntime:
+    """
+    Process-wide event loop running in a daemon thread.
+
+    Streamlit runs each session in its own synchronous script thread. They
+    submit coroutines to this single loop, so LLM and database I/O from all
+    sessions overlaps on one loop and shares one async connection pool,
+    which is tied to the loop that created it.
+    """
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        """Get the shared loop, starting its thread on first use"""
+        with cls._lock:
+            if cls._loop is None or not cls._thread.is_alive():
+                cls._loop = asyncio.new_event_loop()
+                cls._thread = threading.Thread(
+                    target=cls._loop.run_forever, name="async-runtime", daemon=True
+                )
+                cls._thread.start()
+                logger.info("Async runtime loop started")
+            return cls._loop
+
+    @classmethod
+    def run(cls, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, cls.get_loop()).result(timeout)
+
+    @classmethod
+    def iterate(cls, agen: AsyncIterator, max_buffered: int = ITERATE_BUFFER_SIZE) -> Iterator:
+        """
+        Consume an async iterator on the shared loop as a regular iterator
+
+        At most max_buffered items are read ahead of the consumer. Closing
+        the returned generator cancels the producer and closes agen.
+        """
+        loop = cls.get_loop()
+        closed = threading.Event()
+
+        async def new_queue() -> asyncio.Queue:
+            return asyncio.Queue(maxsize=max_buffered)
+
+        items = asyncio.run_coroutine_threadsafe(new_queue(), loop).result()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    await items.put(item)
+            except BaseException as e:
+                # Incluye CancelledError: el consumidor debe ver el error, no quedarse esperando
+                if not closed.is_set():
+                    await items.put(e)
+                if not isinstance(e, Exception):
+                    raise
+            finally:
+                aclose = getattr(agen, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+                # Si el consumidor cerró, nadie lee la cola y un put podría no terminar
+                if not closed.is_set():
+                    await items.put(_DONE)
+
+        producer = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item = asyncio.run_coroutine_threadsafe(items.get(), loop).result()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            closed.set()
+            producer.cancel()
@@ -0,0 +1,102 @@
+# src/utils/bulk_load.py
+import logging
+import os
+import tempfile
+from typing import List
+import pandas as pd
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+# Marcador de NULL en el formato por defecto de LOAD DATA
+NULL_MARKER = "\\N"
+# Cliente sin allow_local_infile, servidor con local_infile=OFF o ruta rechazada
+LOCAL_INFILE_DISABLED_ERRORS = {1148, 2068, 3948}
+
+class LocalInfileUnavailable(Exception):
+    """The server or the client connection does not allow LOAD DATA LOCAL INFILE"""
+
+class BulkLoadRejected(Error):
+    """LOAD DATA converted or skipped values, e.g. a date it could not parse"""
+
+def _format_column(series: pd.Series) -> pd.Series:
+    """Text of one column in LOAD DATA's default escaping, with NULL_MARKER for nulls"""
+    nulls = series.isna()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+    elif pd.api.types.is_bool_dtype(series):
+        text = series.map({True: '1', False: '0'})
+    elif pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        # Enteros que pandas leyó como float por tener nulos
+        text = series.fillna(0).astype('int64').astype(str)
+    elif pd.api.types.is_numeric_dtype(series):
+        text = series.astype(str)
+    else:
+        text = (
+            series.astype(str)
+            .str.replace('\\', '\\\\', regex=False)
+            .str.replace('\t', '\\t', regex=False)
+            .str.replace('\n', '\\n', regex=False)
+            .str.replace('\r', '\\r', regex=False)
+        )
+    return text.astype(object).where(~nulls, NULL_MARKER)
+
+def write_tsv(df: pd.DataFrame, path: str):
+    """
+    Write a DataFrame as a headerless TSV readable by LOAD DATA with its
+    default FIELDS/LINES options (tab separated, backslash escapes, \\N nulls)
+    """
+    if df.empty:
+        open(path, 'w', encoding='utf-8').close()
+        return
+    columns = [_format_column(df[col]) for col in df.columns]
+    lines = columns[0].str.cat(columns[1:], sep='\t') if len(columns) > 1 else columns[0]
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('\n'.join(lines))
+        f.write('\n')
+
+def bulk_load_dataframe(conn, cursor, table_name: str, df: pd.DataFrame, columns: List[str]) -> int:
+    """
+    Load a DataFrame into a MySQL table with LOAD DATA LOCAL INFILE.
+
+    The frame is written to a temporary TSV that is removed afterwards;
+    its columns map positionally to columns. The connection must be opened
+    with allow_local_infile=True. Dates and numbers must already be parsed:
+    with LOCAL, MySQL stores NULL or zero for values it cannot convert and
+    only reports a warning, so any warning rolls the load back.
+    Commits on success and rolls back on error.
+
+    Returns:
+        int: Rows loaded
+    Raises:
+        LocalInfileUnavailable: LOAD DATA LOCAL is disabled on the client or server
+        BulkLoadRejected: The load produced warnings
+        mysql.connector.Error: Any other load error
+    """
+    fd, tsv_path = tempfile.mkstemp(suffix='.tsv', prefix=f'{table_name}_')
+    os.close(fd)
+    try:
+        write_tsv(df, tsv_path)
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table_name}` "
+            f"CHARACTER SET utf8mb4 "
+            f"(`{'`, `'.join(columns)}`)",
+            (tsv_path.replace(os.sep, '/'),)
+        )
+        loaded = cursor.rowcount
+        cursor.execute("SHOW WARNINGS LIMIT 5")
+        warnings = cursor.fetchall()
+        if warnings:
+            raise BulkLoadRejected(msg=f"LOAD DATA into {table_name} raised warnings: {warnings}")
+        conn.commit()
+        return loaded
+    except Error as e:
+        conn.rollback()
+        if e.errno in LOCAL_INFILE_DISABLED_ERRORS:
+            raise LocalInfileUnavailable(str(e)) from e
+        raise
+    finally:
+        try:
+            os.remove(tsv_path)
+        except OSError:
+            logger.warning(f"Could not remove temporary file {tsv_path}")
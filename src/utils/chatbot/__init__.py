@@ -3,11 +3,15 @@ from .prompts import ChatbotPrompts
 from .insights import InsightGenerator
 from .response import ResponseProcessor
 from .query import QueryProcessor
+from .shaping import ResultShaper
+from .semantic_cache import SemanticQueryCache
 
 __all__ = [
     'ChainBuilder',
     'ChatbotPrompts',
     'InsightGenerator',
     'ResponseProcessor',
-    'QueryProcessor'
+    'QueryProcessor',
+    'ResultShaper',
+    'SemanticQueryCache'
 ]
\ No newline at end of file
@@ -1,14 +1,33 @@
 from typing import Any, Dict
-from langchain_core.runnables import RunnablePassthrough
+from contextvars import copy_context
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
+import asyncio
 import logging
-from ...utils.database import get_schema, run_query
+import time
+from ...utils.database import (
+    get_schema, run_query_rows, arun_query_rows, apply_row_limit, count_query_rows
+)
+from ...utils.profiling import TableProfiler
 from .prompts import ChatbotPrompts
-from ...utils.llm_provider import LLMProvider
-import streamlit as st
+from .shaping import ResultShaper
+from ...utils.context import RequestContext
+from ...utils.tracing import traced, set_attribute, token_usage_callback
+from config.config import (
+    ANALYSIS_TIMEOUT, ANALYSIS_MAX_WORKERS,
+    RESULT_ROW_CAP, RESULT_COUNT_TOTAL
+)
 
 logger = logging.getLogger(__name__)
 
+# Pool compartido por todas las sesiones para los análisis de enriquecimiento
+_analysis_executor = ThreadPoolExecutor(
+    max_workers=ANALYSIS_MAX_WORKERS,
+    thread_name_prefix="analysis"
+)
+
 class ChainBuilder:
     """Handles the creation and configuration of LangChain chains"""
     
@@ -28,21 +47,17 @@ class ChainBuilder:
         return query
 
     @staticmethod
-    def build_sql_chain():
-        """Build the SQL generation chain"""
+    def build_sql_chain(context: RequestContext):
+        """Build the SQL generation chain with the LLM settings of the request"""
         try:
             prompt = ChatbotPrompts.get_sql_prompt()
-            llm = LLMProvider.get_llm(
-                provider=st.session_state.get('llm_provider', 'openai'),
-                model_name=st.session_state.get('llm_model_name'),
-                temperature=st.session_state.get('llm_temperature', 0.7)
-            )
+            llm = context.get_llm()
             
             return (
                 RunnablePassthrough()
                 | ChainBuilder._format_sql_input
                 | prompt
-                | llm.bind(stop=["\nSQLResult:"])
+                | llm.bind(stop=["\nSQLResult:"]).with_config(callbacks=[token_usage_callback])
                 | StrOutputParser()
                 | ChainBuilder._clean_sql_query
             )
@@ -51,29 +66,47 @@ class ChainBuilder:
             raise
     
     @staticmethod
-    def build_response_chain(sql_chain):
-        """Build the response generation chain with enhanced analysis"""
+    def build_context_chain(context: RequestContext, sql_chain=None):
+        """
+        Build the chain that runs the query and analyses and returns the
+        variables of the response prompt, including the typed "result"
+        
+        If sql_chain is None, the chain expects an already generated "query"
+        in its input and does not call the LLM to generate SQL again.
+        
+        With ainvoke the query runs on the async engine and the analyses are
+        gathered on the event loop. The RAG context and the LLM settings for
+        schema suggestions are read from context when the chain runs.
+        """
+        query_step = sql_chain if sql_chain is not None else ChainBuilder._get_query
+        
+        # Enhanced chain with additional analysis steps
+        return (
+            RunnablePassthrough.assign(query=query_step)
+            .assign(schema=ChainBuilder._get_schema)
+            .assign(result=RunnableLambda(ChainBuilder._run_query, afunc=ChainBuilder._arun_query))
+            .assign(response=ChainBuilder._shape_result)
+            | RunnableLambda(ChainBuilder._run_analyses, afunc=ChainBuilder._arun_analyses)
+            | RunnableLambda(partial(ChainBuilder._process_enhanced_response, context=context))
+        )
+    
+    @staticmethod
+    def build_answer_chain(context: RequestContext):
+        """Build the final LLM step that writes the answer from the prompt variables"""
         try:
             prompt = ChatbotPrompts.get_response_prompt()
-            llm = LLMProvider.get_llm(
-                provider=st.session_state.get('llm_provider', 'openai'),
-                model_name=st.session_state.get('llm_model_name'),
-                temperature=st.session_state.get('llm_temperature', 0.7)
-            )
+            llm = context.get_llm()
             
-            # Enhanced chain with additional analysis steps
-            return (
-                RunnablePassthrough.assign(query=sql_chain)
-                .assign(schema=ChainBuilder._get_schema)
-                .assign(response=ChainBuilder._run_query)
-                .assign(temporal_analysis=ChainBuilder._analyze_temporal_patterns)
-                .assign(statistical_analysis=ChainBuilder._analyze_statistics)
-                .assign(comparative_analysis=ChainBuilder._analyze_comparisons)
-                | ChainBuilder._process_enhanced_response
-                | prompt
-                | llm
-                | StrOutputParser()
-            )
+            return prompt | llm.with_config(callbacks=[token_usage_callback]) | StrOutputParser()
+        except Exception as e:
+            logger.error(f"Error building answer chain: {str(e)}")
+            raise
+    
+    @staticmethod
+    def build_response_chain(context: RequestContext, sql_chain=None):
+        """Build the response generation chain with enhanced analysis"""
+        try:
+            return ChainBuilder.build_context_chain(context, sql_chain) | ChainBuilder.build_answer_chain(context)
         except Exception as e:
             logger.error(f"Error building response chain: {str(e)}")
             raise
@@ -95,6 +128,15 @@ class ChainBuilder:
             raise
 
     @staticmethod
+    def _get_query(vars: Dict[str, Any]) -> str:
+        """Get the pre-generated SQL query from the chain input"""
+        query = vars.get("query")
+        if not query:
+            raise ValueError("No query provided")
+        return query
+
+    @staticmethod
+    @traced("schema.fetch")
     def _get_schema(vars: Dict[str, Any]) -> str:
         """Get schema information for selected tables"""
         try:
@@ -104,185 +146,208 @@ class ChainBuilder:
             raise
 
     @staticmethod
-    def _run_query(vars: Dict[str, Any]) -> Any:
-        """Execute SQL query"""
+    @traced("sql.execute")
+    def _run_query(vars: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute SQL query and return typed rows with column names
+        
+        At most RESULT_ROW_CAP rows are fetched; SELECT statements without
+        a LIMIT are rewritten so the cap is also enforced by the server.
+        """
+        try:
+            query = vars.get("query")
+            if not query:
+                raise ValueError("No query provided")
+            # Pedir una fila extra para saber si el resultado fue truncado
+            result = run_query_rows(apply_row_limit(query, RESULT_ROW_CAP + 1), max_rows=RESULT_ROW_CAP)
+            set_attribute("db.rows", result["row_count"])
+            set_attribute("db.truncated", result["truncated"])
+            if result["truncated"]:
+                logger.warning(f"Query result truncated to {RESULT_ROW_CAP} rows")
+                if RESULT_COUNT_TOTAL:
+                    result["total_rows"] = count_query_rows(query)
+            return result
+        except Exception as e:
+            logger.error(f"Error running query: {str(e)}")
+            raise
+
+    @staticmethod
+    @traced("sql.execute")
+    async def _arun_query(vars: Dict[str, Any]) -> Dict[str, Any]:
+        """Async counterpart of _run_query, on the async engine"""
         try:
             query = vars.get("query")
             if not query:
                 raise ValueError("No query provided")
-            return run_query(query)
+            result = await arun_query_rows(apply_row_limit(query, RESULT_ROW_CAP + 1), max_rows=RESULT_ROW_CAP)
+            set_attribute("db.rows", result["row_count"])
+            set_attribute("db.truncated", result["truncated"])
+            if result["truncated"]:
+                logger.warning(f"Query result truncated to {RESULT_ROW_CAP} rows")
+                if RESULT_COUNT_TOTAL:
+                    result["total_rows"] = await asyncio.to_thread(count_query_rows, query)
+            return result
         except Exception as e:
             logger.error(f"Error running query: {str(e)}")
             raise
 
     @staticmethod
+    def _shape_result(vars: Dict[str, Any]) -> str:
+        """Render the query result for the prompt, summarizing large results"""
+        return ResultShaper.format_for_prompt(vars.get("result") or {})
+
+    @staticmethod
+    def _run_analyses(vars: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run the temporal, statistical and comparative analyses concurrently.
+
+        Each branch gets ANALYSIS_TIMEOUT seconds from the moment they are all
+        submitted; a branch that fails or does not finish in time contributes
+        an empty result instead of blocking the answer. Branches still queued
+        at the deadline are cancelled; running ones are stopped by the
+        statement time limit of the profile queries.
+        """
+        branches = {
+            "temporal_analysis": ChainBuilder._analyze_temporal_patterns,
+            "statistical_analysis": ChainBuilder._analyze_statistics,
+            "comparative_analysis": ChainBuilder._analyze_comparisons
+        }
+        # Cada rama corre en una copia del contexto, para que sus spans queden bajo la traza actual
+        futures = {
+            key: _analysis_executor.submit(copy_context().run, func, dict(vars))
+            for key, func in branches.items()
+        }
+        deadline = time.monotonic() + ANALYSIS_TIMEOUT
+        
+        results = dict(vars)
+        for key, future in futures.items():
+            try:
+                results[key] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeoutError:
+                ChainBuilder._record_analysis_timeout(key, cancelled=future.cancel())
+                results[key] = {}
+            except Exception as e:
+                logger.error(f"Error in {key}: {str(e)}")
+                results[key] = {}
+        return results
+
+    @staticmethod
+    def _record_analysis_timeout(key: str, cancelled: bool = False):
+        """Log an analysis branch that overran ANALYSIS_TIMEOUT and mark it on the active span"""
+        state = "cancelled before starting" if cancelled else "still running until its query time limit"
+        logger.warning(f"{key} timed out after {ANALYSIS_TIMEOUT}s ({state}), continuing without it")
+        set_attribute(f"analysis.{key}.timed_out", True)
+
+    @staticmethod
+    async def _arun_analyses(vars: Dict[str, Any]) -> Dict[str, Any]:
+        """Async counterpart of _run_analyses, gathering the branches on the event loop"""
+        branches = {
+            "temporal_analysis": ChainBuilder._analyze_temporal_patterns,
+            "statistical_analysis": ChainBuilder._analyze_statistics,
+            "comparative_analysis": ChainBuilder._analyze_comparisons
+        }
+        loop = asyncio.get_running_loop()
+        # Los perfiles usan el engine síncrono: se ejecutan en el mismo pool acotado
+        outcomes = await asyncio.gather(
+            *[
+                asyncio.wait_for(
+                    loop.run_in_executor(_analysis_executor, copy_context().run, func, dict(vars)),
+                    ANALYSIS_TIMEOUT
+                )
+                for func in branches.values()
+            ],
+            return_exceptions=True
+        )
+        
+        results = dict(vars)
+        for key, outcome in zip(branches, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                # wait_for cancela el future del pool si la rama aún no había empezado
+                ChainBuilder._record_analysis_timeout(key)
+                results[key] = {}
+            elif isinstance(outcome, Exception):
+                logger.error(f"Error in {key}: {str(outcome)}")
+                results[key] = {}
+            else:
+                results[key] = outcome
+        return results
+
+    @staticmethod
+    @traced("analysis.temporal")
     def _analyze_temporal_patterns(vars: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze temporal patterns in the data"""
         try:
-            schema = vars.get("schema", "")
             selected_tables = vars.get("selected_tables", [])
-            if not (schema and selected_tables):
+            if not selected_tables:
                 return {}
 
-            # Identificar columnas de fecha en cada tabla
-            date_columns = {}
-            for table in selected_tables:
-                table_schema = [line for line in schema.split('\n') if table in line]
-                for line in table_schema:
-                    if any(date_type in line.lower() for date_type in ["date", "timestamp"]):
-                        col_name = line.split()[0]
-                        date_columns[f"{table}.{col_name}"] = col_name
-
-            if not date_columns:
-                return {}
-
-            analysis = {}
-            for table_col, date_col in date_columns.items():
-                table = table_col.split('.')[0]
-                try:
-                    query = f"""
-                    SELECT 
-                        EXTRACT(YEAR FROM {date_col}) as year,
-                        EXTRACT(MONTH FROM {date_col}) as month,
-                        COUNT(*) as count
-                    FROM {table}
-                    GROUP BY 
-                        EXTRACT(YEAR FROM {date_col}),
-                        EXTRACT(MONTH FROM {date_col})
-                    ORDER BY year, month
-                    """
-                    temporal_results = run_query(query)
-                    analysis[table_col] = temporal_results
-                except Exception as e:
-                    logger.error(f"Error analyzing temporal patterns for {table_col}: {str(e)}")
-                    continue
-
-            return {"temporal_patterns": analysis}
+            analysis = TableProfiler.get_profiles(selected_tables, "temporal")
+            return {"temporal_patterns": analysis} if analysis else {}
         except Exception as e:
             logger.error(f"Error in temporal analysis: {str(e)}")
             return {}
 
     @staticmethod
+    @traced("analysis.statistical")
     def _analyze_statistics(vars: Dict[str, Any]) -> Dict[str, Any]:
         """Perform statistical analysis on numerical columns"""
         try:
-            schema = vars.get("schema", "")
             selected_tables = vars.get("selected_tables", [])
-            if not (schema and selected_tables):
+            if not selected_tables:
                 return {}
 
-            # Identificar columnas numéricas en cada tabla
-            numeric_columns = {}
-            for table in selected_tables:
-                table_schema = [line for line in schema.split('\n') if table in line]
-                for line in table_schema:
-                    if any(num_type in line.lower() for num_type in ["int", "decimal", "float", "double"]):
-                        col_name = line.split()[0]
-                        numeric_columns[f"{table}.{col_name}"] = col_name
-
-            if not numeric_columns:
-                return {}
-
-            analysis = {}
-            for table_col, num_col in numeric_columns.items():
-                table = table_col.split('.')[0]
-                try:
-                    query = f"""
-                    SELECT 
-                        AVG({num_col}) as mean,
-                        STDDEV({num_col}) as std_dev,
-                        MIN({num_col}) as min_val,
-                        MAX({num_col}) as max_val,
-                        COUNT(*) as count
-                    FROM {table}
-                    """
-                    stats = run_query(query)
-                    analysis[table_col] = stats
-                except Exception as e:
-                    logger.error(f"Error analyzing statistics for {table_col}: {str(e)}")
-                    continue
-
-            return {"statistical_summary": analysis}
+            analysis = TableProfiler.get_profiles(selected_tables, "numeric")
+            return {"statistical_summary": analysis} if analysis else {}
         except Exception as e:
             logger.error(f"Error in statistical analysis: {str(e)}")
             return {}
 
     @staticmethod
+    @traced("analysis.comparative")
     def _analyze_comparisons(vars: Dict[str, Any]) -> Dict[str, Any]:
         """Perform comparative analysis between different categories/groups"""
         try:
-            schema = vars.get("schema", "")
             selected_tables = vars.get("selected_tables", [])
-            if not (schema and selected_tables):
+            if not selected_tables:
                 return {}
 
-            # Identificar columnas categóricas en cada tabla
-            categorical_columns = {}
-            for table in selected_tables:
-                table_schema = [line for line in schema.split('\n') if table in line]
-                for line in table_schema:
-                    if any(cat_type in line.lower() for cat_type in ["varchar", "char", "text"]):
-                        col_name = line.split()[0]
-                        categorical_columns[f"{table}.{col_name}"] = col_name
-
-            if not categorical_columns:
-                return {}
-
-            analysis = {}
-            for table_col, cat_col in categorical_columns.items():
-                table = table_col.split('.')[0]
-                try:
-                    query = f"""
-                    SELECT 
-                        {cat_col},
-                        COUNT(*) as count
-                    FROM {table}
-                    GROUP BY {cat_col}
-                    ORDER BY count DESC
-                    LIMIT 10
-                    """
-                    comparisons = run_query(query)
-                    analysis[table_col] = comparisons
-                except Exception as e:
-                    logger.error(f"Error analyzing comparisons for {table_col}: {str(e)}")
-                    continue
-
-            return {"comparative_analysis": analysis}
+            analysis = TableProfiler.get_profiles(selected_tables, "categorical")
+            return {"comparative_analysis": analysis} if analysis else {}
         except Exception as e:
             logger.error(f"Error in comparative analysis: {str(e)}")
             return {}
 
     @staticmethod
-    def _process_enhanced_response(vars: Dict[str, Any]) -> Dict[str, Any]:
+    @traced("insights")
+    def _process_enhanced_response(vars: Dict[str, Any], context: RequestContext) -> Dict[str, Any]:
         """Process response before final prompt with enhanced analysis"""
         try:
             from .insights import InsightGenerator
             
+            result = vars.get("result") or {}
+            
             # Obtener insights básicos (mantener funcionalidad original)
             schema_data = InsightGenerator.get_default_insights(vars.get("selected_tables", []))
-            schema_suggestions = InsightGenerator.generate_schema_suggestions(schema_data)
+            # Sugerencias desde caché; si faltan se generan en segundo plano
+            schema_suggestions = InsightGenerator.get_schema_suggestions(
+                vars.get("selected_tables", []), schema_data, context
+            )
             
             # Combinar con análisis adicionales
             enhanced_vars = {
                 "insights": schema_data,
                 "suggestions": schema_suggestions,
-                "rag_context": st.session_state.get('last_context', []),
+                "rag_context": context.rag_context,
                 "temporal_analysis": vars.get("temporal_analysis", {}),
                 "statistical_analysis": vars.get("statistical_analysis", {}),
                 "comparative_analysis": vars.get("comparative_analysis", {}),
                 "question": vars.get("question", ""),
                 "query": vars.get("query", ""),
                 "schema": vars.get("schema", ""),
-                "response": vars.get("response", []),
+                "result": result,
+                "response": vars.get("response", ""),
                 "selected_tables": vars.get("selected_tables", [])
             }
-            
-            # Evaluar respuesta si es string
-            if isinstance(enhanced_vars["response"], str):
-                try:
-                    enhanced_vars["response"] = eval(enhanced_vars["response"])
-                except:
-                    pass
 
             return enhanced_vars
         except Exception as e:
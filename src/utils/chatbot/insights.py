@@ -1,12 +1,30 @@
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 import logging
-from ...utils.database import run_query
+import threading
+import time
+from ...utils.database import get_schema_version
+from ...utils.profiling import TableProfiler
+from ...utils.cache import TTLCache
+from ...utils.context import RequestContext
 from .prompts import ChatbotPrompts
-from ...utils.llm_provider import LLMProvider
-import streamlit as st
+from config.config import (
+    SUGGESTIONS_CACHE_TTL, SUGGESTIONS_CACHE_MAX_ENTRIES, SUGGESTIONS_REFRESH_INTERVAL
+)
 
 logger = logging.getLogger(__name__)
 
+# Sugerencias por (conjunto de tablas, versión del esquema), compartidas por todas las sesiones
+_suggestions_cache = TTLCache(
+    max_entries=SUGGESTIONS_CACHE_MAX_ENTRIES,
+    ttl=SUGGESTIONS_CACHE_TTL,
+    name="suggestions_cache"
+)
+# Un solo hilo: las sugerencias no son urgentes y así no compiten con las consultas
+_suggestions_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="suggestions")
+_pending_suggestions = set()
+_pending_lock = threading.Lock()
+
 class InsightGenerator:
     """Handles the generation of insights from database schema and data"""
     
@@ -14,67 +32,57 @@ class InsightGenerator:
     def get_default_insights(selected_tables: List[str]) -> List[Dict]:
         """
         Get basic information about selected tables and generate initial summary
+        
+        Row counts follow ROW_COUNT_MODE (information_schema estimates by
+        default) and columns come from a single information_schema query,
+        so no table is scanned.
         """
         try:
-            columns_data = []
-            for table in selected_tables:
-                try:
-                    query = f"""
-                    SELECT 
-                        COUNT(*) as count,
-                        COALESCE(
-                            (
-                                SELECT GROUP_CONCAT(COLUMN_NAME)
-                                FROM INFORMATION_SCHEMA.COLUMNS
-                                WHERE TABLE_NAME = '{table}'
-                                AND TABLE_SCHEMA = DATABASE()
-                            ),
-                            ''
-                        ) as columns
-                    FROM {table}
-                    """
-                    result = run_query(query)
-                    if result and len(result) > 0:
-                        row = result[0]
-                        count = row[0] if len(row) > 0 else 0
-                        columns = row[1] if len(row) > 1 else ''
-                        
-                        columns_data.append({
-                            "table": table,
-                            "count": count,
-                            "columns": columns.split(',') if columns else []
-                        })
-                    else:
-                        columns_data.append({
-                            "table": table,
-                            "count": 0,
-                            "columns": []
-                        })
-                except Exception as e:
-                    logger.error(f"Error getting info for table {table}: {str(e)}")
-                    columns_data.append({
-                        "table": table,
-                        "count": 0,
-                        "columns": []
-                    })
+            if not selected_tables:
+                return []
+            
+            try:
+                counts, estimated = TableProfiler.get_row_counts(selected_tables)
+            except Exception as e:
+                logger.error(f"Error getting row counts: {str(e)}")
+                counts, estimated = {}, set(selected_tables)
+            
+            try:
+                table_columns = TableProfiler.get_columns(selected_tables, include_keys=True)
+            except Exception as e:
+                logger.error(f"Error getting columns: {str(e)}")
+                table_columns = {}
             
-            return columns_data
+            return [
+                {
+                    "table": table,
+                    "count": counts.get(table, 0),
+                    "count_is_estimate": table in estimated,
+                    "columns": [col for col, _ in table_columns.get(table, [])]
+                }
+                for table in selected_tables
+            ]
 
         except Exception as e:
             logger.error(f"Error getting default insights: {str(e)}")
             return []
 
     @staticmethod
-    def generate_schema_suggestions(schema_data: List[Dict]) -> str:
-        """Generate query suggestions based on schema"""
+    def generate_schema_suggestions(schema_data: List[Dict], context: RequestContext) -> str:
+        """
+        Generate query suggestions based on schema
+        
+        Parameters:
+        -----------
+        schema_data : List[Dict]
+            Output of get_default_insights
+        context : RequestContext
+            Request whose LLM settings are used
+        """
         try:
             prompt = ChatbotPrompts.get_schema_suggestions_prompt()
             
-            llm = LLMProvider.get_llm(
-                provider=st.session_state.get('llm_provider', 'openai'),
-                model_name=st.session_state.get('llm_model_name'),
-                temperature=st.session_state.get('llm_temperature', 0.7)
-            )
+            llm = context.get_llm()
             
             from langchain_core.output_parsers import StrOutputParser
             chain = prompt | llm | StrOutputParser()
@@ -85,6 +93,69 @@ class InsightGenerator:
             logger.error(f"Error generating suggestions: {str(e)}")
             return ""
     
+    @staticmethod
+    def _refresh_suggestions(key: tuple, schema_data: List[Dict], context: RequestContext):
+        try:
+            suggestions = InsightGenerator.generate_schema_suggestions(schema_data, context)
+            # No guardar fallos, para reintentar en la siguiente pregunta
+            if suggestions:
+                _suggestions_cache.set(key, (suggestions, time.monotonic()))
+                logger.info(f"Schema suggestions refreshed for tables: {list(key[0])}")
+        finally:
+            with _pending_lock:
+                _pending_suggestions.discard(key)
+
+    @staticmethod
+    def _schedule_refresh(key: tuple, schema_data: List[Dict], context: RequestContext):
+        with _pending_lock:
+            if key in _pending_suggestions:
+                return
+            _pending_suggestions.add(key)
+        _suggestions_executor.submit(InsightGenerator._refresh_suggestions, key, schema_data, context)
+
+    @staticmethod
+    def get_schema_suggestions(selected_tables: List[str], schema_data: List[Dict],
+                               context: RequestContext, wait: bool = False) -> str:
+        """
+        Get cached query suggestions for a table set and schema version
+        
+        Suggestions older than SUGGESTIONS_REFRESH_INTERVAL are returned as-is
+        and regenerated in the background. On a miss an empty string is
+        returned while they are generated with the LLM settings of context,
+        unless wait is True.
+        """
+        try:
+            tables = sorted(selected_tables or [])
+            key = (tuple(tables), get_schema_version(tables))
+            cached = _suggestions_cache.get(key)
+            if cached is not None:
+                suggestions, generated_at = cached
+                if time.monotonic() - generated_at > SUGGESTIONS_REFRESH_INTERVAL:
+                    InsightGenerator._schedule_refresh(key, schema_data, context)
+                return suggestions
+            
+            if wait:
+                suggestions = InsightGenerator.generate_schema_suggestions(schema_data, context)
+                if suggestions:
+                    _suggestions_cache.set(key, (suggestions, time.monotonic()))
+                return suggestions
+            
+            InsightGenerator._schedule_refresh(key, schema_data, context)
+            return ""
+        except Exception as e:
+            logger.error(f"Error getting schema suggestions: {str(e)}")
+            return ""
+
+    @staticmethod
+    def get_cache_stats() -> Dict:
+        """Return hit/miss statistics of the suggestions cache"""
+        return _suggestions_cache.stats()
+
+    @staticmethod
+    def clear_cache() -> int:
+        """Drop all cached schema suggestions"""
+        return _suggestions_cache.invalidate()
+
     @staticmethod
     def format_schema_overview(schema_data: List[Dict]) -> str:
         """Format schema information in a readable way"""
@@ -94,7 +165,7 @@ class InsightGenerator:
                 overview.append(f"""
 Tabla: {table['table']}
 - Columnas ({len(table['columns'])}): {', '.join(table['columns'])}
-- Registros: {table['count']}
+- Registros: {'~' if table.get('count_is_estimate') else ''}{table['count']}
 """)
             return '\n'.join(overview)
         except Exception as e:
@@ -1,9 +1,12 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
+import asyncio
 import logging
 from .chains import ChainBuilder
 from .response import ResponseProcessor
-from ..database import get_schema, run_query
-import streamlit as st
+from .semantic_cache import SemanticQueryCache
+from ..async_runtime import AsyncRuntime
+from ..context import RequestContext
+from ..tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -11,100 +14,221 @@ class QueryProcessor:
     """Handles query processing and execution"""
     
     @staticmethod
-    def process_query_and_response(question: str, selected_tables: List[str]) -> Dict[str, Any]:
+    def process_query_and_response(question: str, selected_tables: List[str],
+                                   context: RequestContext) -> Dict[str, Any]:
         """
         Process a query and generate a response
         
         Args:
             question (str): User's question
             selected_tables (List[str]): List of selected tables
+            context (RequestContext): LLM settings and RAG handles of the request
             
         Returns:
             Dict[str, Any]: Processed response with all components
         """
         try:
-            # Check RAG availability
-            if st.session_state.get('rag_initialized') and st.session_state.get('rag_enabled', True):
-                return QueryProcessor._process_with_rag(question, selected_tables)
-            else:
-                return QueryProcessor._process_without_rag(question, selected_tables)
+            prepared = QueryProcessor.prepare_query_context(question, selected_tables, context)
+            with span("answer.generate"):
+                answer = ChainBuilder.build_answer_chain(context).invoke(prepared["context"])
+            if prepared["rag"]:
+                # Add RAG indicator to response
+                answer = "🧠 " + str(answer)
+            return QueryProcessor.finalize_response(prepared, answer)
                 
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
             return ResponseProcessor.handle_error_response(question, str(e), selected_tables)
     
     @staticmethod
-    def _process_with_rag(question: str, selected_tables: List[str]) -> Dict[str, Any]:
-        """Process query using RAG enhancement"""
-        try:
-            #from ...services.rag_service import process_query_with_rag
-            from ...services.rag_service import RAGService
-            
-            # Get RAG enhanced query
-            rag_response = RAGService.process_query(question, selected_tables)
-            query = rag_response.get('query', '')
-            context_used = rag_response.get('context_used', [])
-            st.session_state['last_context'] = context_used
-            
-            # Generate response using the enhanced query
-            full_chain = ChainBuilder.build_response_chain(ChainBuilder.build_sql_chain())
-            full_response = full_chain.invoke({
-                "question": question,
-                "query": query,
-                "selected_tables": selected_tables
-            })
-            
-            # Add RAG indicator to response
-            full_response = "🧠 " + str(full_response)
-            
-            return ResponseProcessor.format_response(
-                question=question,
-                query=query,
-                response=full_response,
-                selected_tables=selected_tables
-            )
+    def prepare_query_context(question: str, selected_tables: List[str],
+                              context: RequestContext) -> Dict[str, Any]:
+        """
+        Run every step before the final answer: SQL generation, execution and analyses
+        
+        Args:
+            question (str): User's question
+            selected_tables (List[str]): List of selected tables
+            context (RequestContext): LLM settings and RAG handles of the request
             
-        except Exception as e:
-            logger.error(f"Error in RAG processing: {str(e)}")
-            return ResponseProcessor.handle_error_response(question, str(e), selected_tables)
+        Returns:
+            Dict[str, Any]: question, query, selected_tables, the answer prompt
+            variables under "context", the "rag" and "sql_cache_hit" flags and
+            the request under "request_context"
+        """
+        # El SQL generado con RAG depende de la memoria y documentos de la sesión: no se cachea
+        use_rag = context.use_rag
+        query, sql_cache_hit = None, False
+        if use_rag:
+            query = QueryProcessor._generate_rag_query(question, selected_tables, context)
+        else:
+            # Reutilizar el SQL de una pregunta similar ya respondida
+            query = QueryProcessor._lookup_cached_query(question, selected_tables, context)
+            sql_cache_hit = query is not None
+        
+        if query is None:
+            sql_chain = ChainBuilder.build_sql_chain(context)
+            with span("sql.generate"):
+                query = sql_chain.invoke({
+                    "question": question,
+                    "selected_tables": selected_tables
+                })
+        
+        prompt_vars = ChainBuilder.build_context_chain(context).invoke({
+            "question": question,
+            "query": query,
+            "selected_tables": selected_tables
+        })
+        # Solo se cachea SQL que se ejecutó sin errores y no depende de la sesión
+        if not sql_cache_hit and not use_rag:
+            SemanticQueryCache.store(question, selected_tables, query, context.openai_api_key)
+        
+        return {
+            "question": question,
+            "query": query,
+            "selected_tables": selected_tables,
+            "context": prompt_vars,
+            "rag": use_rag,
+            "sql_cache_hit": sql_cache_hit,
+            "request_context": context
+        }
+    
+    @staticmethod
+    def _lookup_cached_query(question: str, selected_tables: List[str], context: RequestContext) -> Optional[str]:
+        with span("sql.cache_lookup") as current:
+            query = SemanticQueryCache.lookup(question, selected_tables, context.openai_api_key)
+            if current:
+                current.set_attribute("cache.hit", query is not None)
+            return query
+    
+    @staticmethod
+    def _generate_rag_query(question: str, selected_tables: List[str], context: RequestContext) -> str:
+        """Generate the SQL with RAG context, recording the context used on the request"""
+        from ...services.rag_service import RAGService
+        
+        # Get RAG enhanced query
+        with span("rag.generate_sql"):
+            rag_response = RAGService.process_query(question, context, selected_tables)
+        return rag_response.get('query', '')
     
     @staticmethod
-    def _process_without_rag(question: str, selected_tables: List[str]) -> Dict[str, Any]:
-        """Process query without RAG"""
+    def prepare_query_context_async(question: str, selected_tables: List[str],
+                                    context: RequestContext) -> Dict[str, Any]:
+        """
+        Same as prepare_query_context, running on the shared event loop
+        
+        RAG query generation uses the conversation memory, which is bound to
+        the Streamlit session, so it runs on the calling thread before the
+        rest of the pipeline is handed to the loop.
+        """
+        query, use_rag = None, context.use_rag
+        if use_rag:
+            query = QueryProcessor._generate_rag_query(question, selected_tables, context)
+        
+        return AsyncRuntime.run(QueryProcessor.aprepare_query_context(
+            question, selected_tables, context, query=query, rag=use_rag
+        ))
+    
+    @staticmethod
+    async def aprepare_query_context(question: str, selected_tables: List[str], context: RequestContext,
+                                     query: Optional[str] = None, sql_cache_hit: bool = False,
+                                     rag: bool = False) -> Dict[str, Any]:
+        """
+        Async counterpart of prepare_query_context
+        
+        Args:
+            question (str): User's question
+            selected_tables (List[str]): List of selected tables
+            context (RequestContext): LLM settings and RAG handles of the request
+            query (Optional[str]): SQL already resolved by the caller; generated if None
+            sql_cache_hit (bool): Whether query came from the semantic cache
+            rag (bool): Whether query was generated with RAG
+        """
+        api_key = context.openai_api_key
+        if query is None:
+            query = await asyncio.to_thread(QueryProcessor._lookup_cached_query, question, selected_tables, context)
+            sql_cache_hit = query is not None
+            if not sql_cache_hit:
+                with span("sql.generate"):
+                    query = await ChainBuilder.build_sql_chain(context).ainvoke({
+                        "question": question,
+                        "selected_tables": selected_tables
+                    })
+        
+        prompt_vars = await ChainBuilder.build_context_chain(context).ainvoke({
+            "question": question,
+            "query": query,
+            "selected_tables": selected_tables
+        })
+        # Solo se cachea SQL que se ejecutó sin errores y no depende de la sesión
+        if not sql_cache_hit and not rag:
+            await asyncio.to_thread(SemanticQueryCache.store, question, selected_tables, query, api_key)
+        
+        return {
+            "question": question,
+            "query": query,
+            "selected_tables": selected_tables,
+            "context": prompt_vars,
+            "rag": rag,
+            "sql_cache_hit": sql_cache_hit,
+            "request_context": context
+        }
+    
+    @staticmethod
+    def process_query_and_response_async(question: str, selected_tables: List[str],
+                                         context: RequestContext) -> Dict[str, Any]:
+        """Same as process_query_and_response, running the LLM and database steps on the shared event loop"""
         try:
-            # Generate SQL query
-            sql_chain = ChainBuilder.build_sql_chain()
-            query = sql_chain.invoke({
-                "question": question,
-                "selected_tables": selected_tables
-            })
-            
-            # Generate full response
-            full_chain = ChainBuilder.build_response_chain(sql_chain)
-            full_response = full_chain.invoke({
-                "question": question,
-                "query": query,
-                "selected_tables": selected_tables
-            })
-            
-            return ResponseProcessor.format_response(
-                question=question,
-                query=query,
-                response=full_response,
-                selected_tables=selected_tables
-            )
-            
+            prepared = QueryProcessor.prepare_query_context_async(question, selected_tables, context)
+            with span("answer.generate"):
+                answer = AsyncRuntime.run(ChainBuilder.build_answer_chain(context).ainvoke(prepared["context"]))
+            if prepared["rag"]:
+                answer = "🧠 " + str(answer)
+            return QueryProcessor.finalize_response(prepared, answer)
         except Exception as e:
-            logger.error(f"Error in standard processing: {str(e)}")
+            logger.error(f"Error processing async query: {str(e)}")
             return ResponseProcessor.handle_error_response(question, str(e), selected_tables)
     
     @staticmethod
-    def get_schema_overview(selected_tables: List[str]) -> Dict[str, Any]:
+    def stream_answer_async(prepared: Dict[str, Any]) -> Iterator[str]:
+        """Same as stream_answer, consuming astream on the shared event loop"""
+        if prepared["rag"]:
+            yield "🧠 "
+        chain = ChainBuilder.build_answer_chain(prepared["request_context"])
+        with span("answer.generate"):
+            yield from AsyncRuntime.iterate(chain.astream(prepared["context"]))
+    
+    @staticmethod
+    def stream_answer(prepared: Dict[str, Any]) -> Iterator[str]:
+        """Stream the final answer token by token for a prepare_query_context result"""
+        if prepared["rag"]:
+            yield "🧠 "
+        with span("answer.generate"):
+            yield from ChainBuilder.build_answer_chain(prepared["request_context"]).stream(prepared["context"])
+    
+    @staticmethod
+    def finalize_response(prepared: Dict[str, Any], answer: str) -> Dict[str, Any]:
+        """Format the complete answer together with the query results"""
+        response = ResponseProcessor.format_response(
+            question=prepared["question"],
+            query=prepared["query"],
+            response=answer,
+            selected_tables=prepared["selected_tables"],
+            query_result=prepared["context"]["result"]["rows"],
+            context=prepared["request_context"]
+        )
+        if prepared["sql_cache_hit"]:
+            response['sql_cache_hit'] = True
+        return response
+    
+    @staticmethod
+    def get_schema_overview(selected_tables: List[str], context: RequestContext) -> Dict[str, Any]:
         """
         Get an overview of the database schema for selected tables
         
         Args:
             selected_tables (List[str]): List of selected tables
+            context (RequestContext): Request whose LLM settings generate the suggestions
             
         Returns:
             Dict[str, Any]: Schema overview response
@@ -113,7 +237,7 @@ class QueryProcessor:
             from .insights import InsightGenerator
             
             schema_data = InsightGenerator.get_default_insights(selected_tables)
-            suggestions = InsightGenerator.generate_schema_suggestions(schema_data)
+            suggestions = InsightGenerator.get_schema_suggestions(selected_tables, schema_data, context, wait=True)
             overview = InsightGenerator.format_schema_overview(schema_data)
             
             response = f"""
@@ -1,10 +1,12 @@
 from typing import Dict, Any, Tuple, Optional, List
 import pandas as pd
 import logging
-import streamlit as st
 from decimal import Decimal
 import re
 from datetime import datetime, date
+from ..rag_utils import SharedVectorStore
+from ..context import RequestContext
+from ..tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,7 @@ class ResponseProcessor:
     """Handles the processing and formatting of responses"""
     
     @staticmethod
+    @traced("visualization.build")
     def process_visualization_data(response: str, query_result: Optional[List[Tuple]] = None) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
         """
         Extract and process visualization data with enhanced capabilities
@@ -260,8 +263,9 @@ class ResponseProcessor:
     @staticmethod
     def format_response(question: str, query: str, response: str, 
                        selected_tables: List[str], 
-                       query_result: Optional[List[Tuple]] = None) -> Dict[str, Any]:
-        """Format the final response with all components"""
+                       query_result: Optional[List[Tuple]] = None,
+                       context: Optional[RequestContext] = None) -> Dict[str, Any]:
+        """Format the final response with all components, plus the RAG details of context if given"""
         try:
             # Process visualization data with query results
             main_response, visualization_data = ResponseProcessor.process_visualization_data(
@@ -276,14 +280,17 @@ class ResponseProcessor:
                 'schema_overview': None
             }
             
+            if context is None:
+                return formatted_response
+            
             # Add RAG context and document usage if available
-            if 'last_context' in st.session_state:
-                formatted_response['rag_context'] = st.session_state.get('last_context', [])
+            formatted_response['rag_context'] = context.rag_context
             
-            # Add loaded documents info
-            if 'loaded_documents' in st.session_state:
+            # Add loaded documents info from the shared vector store
+            loaded_documents = SharedVectorStore.get_documents() if context.vector_store is not None else {}
+            if loaded_documents:
                 loaded_docs = []
-                for source, info in st.session_state['loaded_documents'].items():
+                for source, info in loaded_documents.items():
                     loaded_docs.append(f"""
 📄 {source}
    Type: {info['type']}
@@ -291,8 +298,8 @@ class ResponseProcessor:
                 formatted_response['loaded_documents'] = loaded_docs
             
             # Add used documents info
-            if 'last_used_documents' in st.session_state:
-                formatted_response['documents_used'] = st.session_state['last_used_documents']
+            if context.used_documents:
+                formatted_response['documents_used'] = context.used_documents
             
             return formatted_response
             
@@ -0,0 +1,196 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import logging
+import re
+import threading
+import time
+import uuid
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from config.config import (
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL
+)
+from ..cache import TTLCache
+from ..database import get_schema_version
+from ..rag_utils import initialize_embeddings
+
+logger = logging.getLogger(__name__)
+
+LITERAL_PATTERN = re.compile(
+    r'(?P<number>\d+(?:[.,]\d+)?)'
+    r'|["\'“‘«](?P<quoted>[^"\'”’»]+)["\'”’»]'
+    r'|(?P<word>[^\W\d_][\w&.-]*)'
+)
+MONTH_NAMES = {
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+    "septiembre", "setiembre", "octubre", "noviembre", "diciembre",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december"
+}
+
+class SemanticQueryCache:
+    """
+    Process-wide question -> SQL cache looked up by embedding similarity.
+
+    Entries are partitioned by scope (selected tables, schema version and the
+    literal values mentioned in the question), with one FAISS index per scope using
+    cosine similarity. A cached query is reused only above
+    SEMANTIC_CACHE_THRESHOLD. Entries expire after SEMANTIC_CACHE_TTL and
+    the least recently used ones are evicted beyond SEMANTIC_CACHE_MAX_ENTRIES.
+    """
+    _stores: Dict[Tuple, FAISS] = {}
+    _entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    _question_vectors = TTLCache(max_entries=256, ttl=SEMANTIC_CACHE_TTL, name="question_embeddings")
+    _lock = threading.RLock()
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    @staticmethod
+    def _get_literals(question: str) -> Tuple[str, ...]:
+        """
+        Values mentioned in the question: numbers, quoted text, capitalized
+        names (not the first word) and month names, in order of appearance
+        """
+        literals = []
+        for match in LITERAL_PATTERN.finditer(question.strip().lstrip("¿¡")):
+            number, quoted, word = match.group("number"), match.group("quoted"), match.group("word")
+            if number:
+                literals.append(number)
+            elif quoted:
+                literals.append(quoted.strip().lower())
+            elif word and (word.lower() in MONTH_NAMES or (word[0].isupper() and match.start() > 0)):
+                literals.append(word.lower())
+        return tuple(literals)
+
+    @staticmethod
+    def _get_scope(question: str, selected_tables: List[str]) -> Tuple:
+        # "top 10" y "top 5", o "ventas de enero" y "de febrero", se parecen mucho
+        # semánticamente pero piden SQL distinto
+        return (
+            tuple(sorted(selected_tables)),
+            get_schema_version(selected_tables),
+            SemanticQueryCache._get_literals(question)
+        )
+
+    @staticmethod
+    def _get_embeddings(api_key: Optional[str]):
+        return initialize_embeddings(api_key) if api_key else None
+
+    @classmethod
+    def _embed(cls, question: str, embeddings) -> List[float]:
+        key = question.strip().lower()
+        vector = cls._question_vectors.get(key)
+        if vector is None:
+            # Vectores unitarios: el producto interno de FAISS es la similitud coseno
+            vector = np.asarray(embeddings.embed_query(key), dtype=np.float32)
+            vector = (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+            cls._question_vectors.set(key, vector)
+        return vector
+
+    @classmethod
+    def lookup(cls, question: str, selected_tables: List[str], api_key: Optional[str]) -> Optional[str]:
+        """Return the SQL of a similar cached question for the same scope, if any (needs an OpenAI key)"""
+        if not SEMANTIC_CACHE_ENABLED:
+            return None
+        try:
+            embeddings = cls._get_embeddings(api_key)
+            if not embeddings:
+                return None
+            scope = cls._get_scope(question, selected_tables)
+            vector = cls._embed(question, embeddings)
+
+            with cls._lock:
+                store = cls._stores.get(scope)
+                matches = store.similarity_search_with_score_by_vector(vector, k=1) if store else []
+                if matches:
+                    document, score = matches[0]
+                    entry_id = document.metadata["entry_id"]
+                    entry = cls._entries.get(entry_id)
+                    if entry and time.time() - entry["created"] > SEMANTIC_CACHE_TTL:
+                        cls._evict(entry_id)
+                        entry = None
+                    if entry and score >= SEMANTIC_CACHE_THRESHOLD:
+                        cls._entries.move_to_end(entry_id)
+                        entry["hits"] += 1
+                        cls.hits += 1
+                        logger.info(f"Semantic cache hit ({score:.3f}) for: {question} ~ {entry['question']}")
+                        return entry["query"]
+                cls.misses += 1
+            return None
+        except Exception as e:
+            logger.error(f"Error looking up semantic cache: {str(e)}")
+            return None
+
+    @classmethod
+    def store(cls, question: str, selected_tables: List[str], query: str, api_key: Optional[str]):
+        """Cache the SQL generated for a question (needs an OpenAI key)"""
+        if not SEMANTIC_CACHE_ENABLED or not query:
+            return
+        try:
+            embeddings = cls._get_embeddings(api_key)
+            if not embeddings:
+                return
+            scope = cls._get_scope(question, selected_tables)
+            vector = cls._embed(question, embeddings)
+            entry_id = uuid.uuid4().hex
+
+            with cls._lock:
+                metadata = {"entry_id": entry_id}
+                if scope in cls._stores:
+                    cls._stores[scope].add_embeddings([(question, vector)], metadatas=[metadata], ids=[entry_id])
+                else:
+                    cls._stores[scope] = FAISS.from_embeddings(
+                        [(question, vector)], embeddings,
+                        metadatas=[metadata], ids=[entry_id],
+                        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+                    )
+                cls._entries[entry_id] = {
+                    "question": question,
+                    "query": query,
+                    "scope": scope,
+                    "created": time.time(),
+                    "hits": 0
+                }
+                while len(cls._entries) > SEMANTIC_CACHE_MAX_ENTRIES:
+                    cls._evict(next(iter(cls._entries)))
+        except Exception as e:
+            logger.error(f"Error storing in semantic cache: {str(e)}")
+
+    @classmethod
+    def _evict(cls, entry_id: str):
+        entry = cls._entries.pop(entry_id, None)
+        if not entry:
+            return
+        store = cls._stores.get(entry["scope"])
+        if store:
+            if store.index.ntotal <= 1:
+                del cls._stores[entry["scope"]]
+            else:
+                store.delete([entry_id])
+        cls.evictions += 1
+
+    @classmethod
+    def clear(cls):
+        """Drop all cached questions"""
+        with cls._lock:
+            cls._stores.clear()
+            cls._entries.clear()
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Return size and hit/miss counters"""
+        with cls._lock:
+            lookups = cls.hits + cls.misses
+            return {
+                "name": "semantic_query_cache",
+                "size": len(cls._entries),
+                "max_entries": SEMANTIC_CACHE_MAX_ENTRIES,
+                "ttl": SEMANTIC_CACHE_TTL,
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "evictions": cls.evictions,
+                "hit_rate": round(cls.hits / lookups, 3) if lookups else 0.0
+            }
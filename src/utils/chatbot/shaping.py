@@ -0,0 +1,83 @@
+from typing import Any, Dict, List
+from collections import Counter
+from decimal import Decimal
+import logging
+from config.config import LLM_RESULT_ROWS, LLM_RESULT_TOP_K
+
+logger = logging.getLogger(__name__)
+
+class ResultShaper:
+    """Reduces large query results to a bounded summary before they reach the LLM"""
+
+    @staticmethod
+    def _numeric_summary(columns: List[str], rows: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """Compute count, sum, min, max and mean of the numeric columns"""
+        summary = {}
+        for idx, col in enumerate(columns):
+            values = [
+                float(row[idx]) for row in rows
+                if isinstance(row[idx], (int, float, Decimal)) and not isinstance(row[idx], bool)
+            ]
+            if not values:
+                continue
+            summary[col] = {
+                "count": len(values),
+                "sum": round(sum(values), 2),
+                "min": min(values),
+                "max": max(values),
+                "mean": round(sum(values) / len(values), 2)
+            }
+        return summary
+
+    @staticmethod
+    def _top_values(columns: List[str], rows: List[tuple], k: int) -> Dict[str, List[tuple]]:
+        """Get the most frequent values of the text columns"""
+        top_values = {}
+        for idx, col in enumerate(columns):
+            values = [row[idx] for row in rows if isinstance(row[idx], str)]
+            if values:
+                top_values[col] = Counter(values).most_common(k)
+        return top_values
+
+    @staticmethod
+    def format_for_prompt(result: Dict[str, Any], max_rows: int = LLM_RESULT_ROWS) -> str:
+        """
+        Render a run_query_rows result for the response prompt
+
+        Small results are passed as-is. Larger ones are replaced by the
+        head and tail rows, numeric aggregates and the top values of the
+        text columns, so prompt size stays bounded whatever the result size.
+        """
+        try:
+            columns = result.get("columns", [])
+            rows = result.get("rows", [])
+            if len(rows) <= max_rows and not result.get("truncated"):
+                return str(rows)
+
+            half = max(max_rows // 2, 1)
+            total = result.get("total_rows")
+            if total is not None:
+                size_note = f"{total} rows in total, {len(rows)} fetched"
+            elif result.get("truncated"):
+                size_note = f"more than {len(rows)} rows, only the first {len(rows)} were fetched"
+            else:
+                size_note = f"{len(rows)} rows"
+
+            summary = [
+                f"Result too large to show in full ({size_note}).",
+                f"Columns: {columns}",
+                f"First {min(half, len(rows))} rows: {rows[:half]}",
+            ]
+            tail = rows[max(half, len(rows) - half):]
+            if tail:
+                summary.append(f"Last {len(tail)} rows: {tail}")
+            numeric = ResultShaper._numeric_summary(columns, rows)
+            if numeric:
+                summary.append(f"Numeric column summary over fetched rows: {numeric}")
+            top_values = ResultShaper._top_values(columns, rows, LLM_RESULT_TOP_K)
+            if top_values:
+                summary.append(f"Most frequent values over fetched rows: {top_values}")
+            return "\n".join(summary)
+        except Exception as e:
+            logger.error(f"Error shaping query result: {str(e)}")
+            return str(result.get("rows", [])[:max_rows])
@@ -0,0 +1,64 @@
+# src/utils/context.py
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import streamlit as st
+from langchain_core.language_models.chat_models import BaseChatModel
+from .llm_provider import LLMProvider
+from .rag_utils import SharedVectorStore
+
+@dataclass
+class RequestContext:
+    """
+    Settings and handles needed to answer one question.
+
+    The chatbot core reads everything from here instead of the Streamlit
+    session, so it can run from worker threads, scripts or a service. The
+    UI builds it with from_session(); other callers construct it directly.
+    RAG is used only when vector_store and memory are both set.
+    """
+    provider: str = "openai"
+    model_name: Optional[str] = None
+    temperature: float = 0.7
+    openai_api_key: Optional[str] = None
+    vector_store: Any = None
+    memory: Any = None
+    # Embeddings de la sesión, para las búsquedas en el vector store compartido
+    embeddings: Any = None
+    rag_enabled: bool = True
+    # Resultados de la generación con RAG, para adjuntarlos a la respuesta
+    rag_context: List[str] = field(default_factory=list)
+    used_documents: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def from_session(cls) -> "RequestContext":
+        """Build the context from the current Streamlit session state"""
+        rag_initialized = bool(st.session_state.get('rag_initialized'))
+        embeddings = st.session_state.get('rag_embeddings') if rag_initialized else None
+        return cls(
+            provider=st.session_state.get('llm_provider', 'openai'),
+            model_name=st.session_state.get('llm_model_name'),
+            temperature=st.session_state.get('llm_temperature', 0.7),
+            openai_api_key=st.session_state.get('OPENAI_API_KEY'),
+            vector_store=SharedVectorStore.get(embeddings) if rag_initialized else None,
+            memory=st.session_state.get('conversation_memory') if rag_initialized else None,
+            embeddings=embeddings,
+            rag_enabled=st.session_state.get('rag_enabled', True)
+        )
+
+    @property
+    def use_rag(self) -> bool:
+        return bool(self.rag_enabled and self.vector_store is not None and self.memory is not None)
+
+    @property
+    def llm_settings(self) -> Dict[str, Any]:
+        """Keyword arguments for LLMProvider.get_llm"""
+        return {
+            "provider": self.provider,
+            "model_name": self.model_name,
+            "temperature": self.temperature,
+            "api_key": self.openai_api_key
+        }
+
+    def get_llm(self) -> BaseChatModel:
+        """Get the shared LLM client for these settings"""
+        return LLMProvider.get_llm(**self.llm_settings)
@@ -1,40 +1,175 @@
 # src/utils/database.py
 
-from config.config import MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_DATABASE
+from config.config import (
+    MYSQL_USER, MYSQL_PASSWORD, MYSQL_HOST, MYSQL_DATABASE, DATABASE_URI,
+    SCHEMA_CACHE_TTL, SCHEMA_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_ENABLED, RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_ROWS,
+    RESULT_VERSION_CHECK_INTERVAL,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    QUERY_STREAM_CHUNK_SIZE, DB_ASYNC_DRIVER
+)
 from langchain_community.utilities import SQLDatabase
+import asyncio
+import hashlib
 import os
-from typing import List, Dict, Optional
-from sqlalchemy import text, create_engine, inspect
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Dict, Optional
+import pandas as pd
+from sqlalchemy import text, create_engine, inspect, event, exc, bindparam
+from sqlalchemy.pool import QueuePool
 import logging
-import mysql.connector
+from .cache import TTLCache, get_marker_version
+from .table_stats import TABLE_STATS_TABLE
+from .tracing import set_attribute
 
 logger = logging.getLogger(__name__)
 
+# Cache de esquemas compartido por todas las sesiones, indexado por conjunto de tablas
+_schema_cache = TTLCache(
+    max_entries=SCHEMA_CACHE_MAX_ENTRIES,
+    ttl=SCHEMA_CACHE_TTL,
+    name="schema_cache"
+)
+
+# Resultados de consultas, indexados por SQL normalizado y versión de datos de cada tabla
+_result_cache = TTLCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    ttl=RESULT_CACHE_TTL,
+    name="result_cache"
+)
+
+# Última lectura de information_schema.TABLES, indexada por los marcadores de los loaders
+_table_versions_cache = TTLCache(
+    max_entries=4,
+    ttl=RESULT_VERSION_CHECK_INTERVAL,
+    name="table_versions_cache"
+)
+
+# Literales y comentarios de SQL; los literales se conservan tal cual al normalizar
+_SQL_TOKEN = re.compile(
+    r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`[^`]*`"""
+    r"|(?P<space>(?:\s+|--[^\n]*|#[^\n]*|/\*.*?\*/)+)",
+    re.DOTALL
+)
+_CACHEABLE_STATEMENT = re.compile(r'^(select|show|with)\b', re.IGNORECASE)
+# Sentencias cuyo resultado cambia en cada ejecución o que toman bloqueos
+_VOLATILE_STATEMENT = re.compile(
+    r'\b(rand|uuid|uuid_short|sleep|get_lock|release_lock|connection_id|last_insert_id|found_rows)\s*\('
+    r'|\bfor\s+update\b|\block\s+in\s+share\s+mode\b|\binto\s+(outfile|dumpfile|@)',
+    re.IGNORECASE
+)
+
+class PoolMetrics:
+    """Thread-safe counters for connection pool checkouts, wait time and exhaustion"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.exhausted = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.peak_checked_out = 0
+    
+    def record_checkout(self, wait_time: float, checked_out: int):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+    
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "exhausted": self.exhausted,
+                "wait_time_avg_ms": round(1000 * self.wait_time_total / self.checkouts, 2) if self.checkouts else 0.0,
+                "wait_time_max_ms": round(1000 * self.wait_time_max, 2),
+                "peak_checked_out": self.peak_checked_out
+            }
+
+pool_metrics = PoolMetrics()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait time and pool exhaustion in pool_metrics"""
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_metrics.increment("exhausted")
+            logger.warning(f"Connection pool exhausted: {self.status()}")
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start, self.checkedout())
+        return connection
+
+def _create_engine(uri: str):
+    """Create the pooled engine shared by all sessions"""
+    pooled_engine = create_engine(
+        uri,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+    event.listen(pooled_engine, "connect", lambda *args: pool_metrics.increment("connects"))
+    event.listen(pooled_engine, "checkin", lambda *args: pool_metrics.increment("checkins"))
+    event.listen(pooled_engine, "invalidate", lambda *args: pool_metrics.increment("invalidations"))
+    return pooled_engine
+
+def _create_async_engine(uri: str):
+    """Create the async engine with the same pool settings as the sync one"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    return create_async_engine(
+        uri,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+
+def get_pool_metrics() -> Dict:
+    """Return connection pool counters and the current pool status"""
+    metrics = pool_metrics.snapshot()
+    if engine:
+        metrics.update({
+            "pool_size": engine.pool.size(),
+            "checked_out": engine.pool.checkedout(),
+            "overflow": engine.pool.overflow(),
+            "max_overflow": DB_MAX_OVERFLOW
+        })
+    return metrics
+
 def test_database_connection() -> Dict:
     """Test database connection and return status"""
     try:
-        # Primero probar conexión básica
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE
-        )
+        if not engine:
+            raise Exception("Database engine not initialized")
         
-        if conn.is_connected():
-            # Si la conexión es exitosa, obtener las tablas
-            cursor = conn.cursor()
-            cursor.execute("SHOW TABLES")
-            tables = [table[0] for table in cursor.fetchall()]
-            
-            cursor.close()
-            conn.close()
-            
-            return {
-                "success": True,
-                "tables": tables,
-                "error": None
-            }
+        # Reutilizar una conexión del pool compartido
+        with engine.connect() as conn:
+            tables = [row[0] for row in conn.execute(text("SHOW TABLES"))]
+        
+        return {
+            "success": True,
+            "tables": tables,
+            "error": None
+        }
     except Exception as e:
         logger.error(f"Database connection error: {str(e)}")
         return {
@@ -43,17 +178,30 @@ def test_database_connection() -> Dict:
             "error": str(e)
         }
 
-# Construir el URI de conexión para MySQL
-mysql_uri = f'mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:3306/{MYSQL_DATABASE}'
+# Construir el URI de conexión para MySQL, salvo que DATABASE_URI lo reemplace
+mysql_uri = DATABASE_URI or f'mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:3306/{MYSQL_DATABASE}'
+# Con un driver síncrono en DATABASE_URI no hay engine async y el pipeline async usa hilos
+mysql_async_uri = DATABASE_URI or f'mysql+{DB_ASYNC_DRIVER}://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:3306/{MYSQL_DATABASE}'
 
 try:
-    # Inicializar conexiones
-    db = SQLDatabase.from_uri(mysql_uri)
-    engine = create_engine(mysql_uri)
+    # Un solo engine con pool, compartido también por SQLDatabase
+    engine = _create_engine(mysql_uri)
+except Exception as e:
+    logger.error(f"Error initializing database engine: {str(e)}")
+    engine = None
+
+try:
+    # Engine asíncrono para el pipeline async; sus conexiones viven en el loop de AsyncRuntime
+    async_engine = _create_async_engine(mysql_async_uri)
+except Exception as e:
+    logger.warning(f"Async database engine not available, async pipeline will use threads: {str(e)}")
+    async_engine = None
+
+try:
+    db = SQLDatabase(engine) if engine else None
 except Exception as e:
     logger.error(f"Error initializing database connections: {str(e)}")
     db = None
-    engine = None
 
 def get_ignored_tables() -> List[str]:
     """Get list of tables to ignore from environment variable"""
@@ -67,7 +215,8 @@ def get_all_tables() -> List[str]:
             raise Exception("Database engine not initialized")
         
         inspector = inspect(engine)
-        tables = inspector.get_table_names()
+        # La tabla de metadatos de los loaders no es consultable por el usuario
+        tables = [table for table in inspector.get_table_names() if table != TABLE_STATS_TABLE]
         logger.info(f"Found tables: {tables}")
         return tables
     except Exception as e:
@@ -96,13 +245,64 @@ def get_schema(selected_tables: Optional[List[str]] = None) -> str:
         if not selected_tables:
             return "No tables available for querying."
         
-        logger.info(f"Getting schema for tables: {selected_tables}")
-        schema_info = db.get_table_info(table_names=selected_tables)
+        # El marcador lo actualizan los loaders al crear tablas en otro proceso
+        cache_key = (tuple(sorted(selected_tables)), get_marker_version("schema"))
+        schema_info = _schema_cache.get(cache_key)
+        if schema_info is None:
+            logger.info(f"Getting schema for tables: {selected_tables}")
+            schema_info = db.get_table_info(table_names=selected_tables)
+            _schema_cache.set(cache_key, schema_info)
         return schema_info
     except Exception as e:
         logger.error(f"Error getting schema information: {str(e)}")
         return f"Error getting schema information: {str(e)}"
 
+def get_schema_version(selected_tables: List[str]) -> str:
+    """
+    Get a short hash of the column definitions of the selected tables
+    
+    Unlike the schema text it ignores sample rows, so it only changes
+    when columns are added, removed or retyped.
+    """
+    tables = sorted(selected_tables or [])
+    cache_key = ("version", tuple(tables), get_marker_version("schema"))
+    version = _schema_cache.get(cache_key)
+    if version is None:
+        try:
+            statement = text("""
+                SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables
+                ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """).bindparams(bindparam("tables", expanding=True))
+            with engine.connect() as conn:
+                definition = str([tuple(row) for row in conn.execute(statement, {"tables": tables})])
+        except Exception as e:
+            logger.warning(f"Could not read column definitions, using schema text: {str(e)}")
+            definition = get_schema(tables)
+        version = hashlib.sha256(definition.encode("utf-8")).hexdigest()[:16]
+        _schema_cache.set(cache_key, version)
+    return version
+
+def invalidate_schema_cache(tables: Optional[List[str]] = None) -> int:
+    """
+    Drop cached schema information
+    
+    Parameters:
+    -----------
+    tables : Optional[List[str]]
+        Only drop entries that include any of these tables. If None, drops everything.
+    """
+    if not tables:
+        return _schema_cache.invalidate()
+    tables = set(tables)
+    # Las claves terminan en (tablas, versión del marcador)
+    return _schema_cache.invalidate(lambda key: bool(tables.intersection(key[-2])))
+
+def get_schema_cache_stats() -> Dict:
+    """Return hit/miss statistics of the schema cache"""
+    return _schema_cache.stats()
+
 def run_query(query: str) -> List[tuple]:
     """Execute SQL query"""
     try:
@@ -114,4 +314,255 @@ def run_query(query: str) -> List[tuple]:
         return result
     except Exception as e:
         logger.error(f"Error executing query: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def normalize_query(query: str) -> str:
+    """Strip comments and the trailing semicolon and collapse whitespace outside string literals"""
+    def replace(match: re.Match) -> str:
+        return " " if match.group("space") is not None else match.group(0)
+    return _SQL_TOKEN.sub(replace, query).strip().rstrip(';').strip()
+
+_TABLE_VERSIONS_SQL = """
+    SELECT TABLE_NAME, UPDATE_TIME, TABLE_ROWS, CREATE_TIME
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+def get_table_data_versions(query: str) -> tuple:
+    """
+    Get the data version of every table referenced by a query
+    
+    Referenced tables are the known table names that appear as identifiers
+    in the statement. The markers bumped by the loaders are the source of
+    truth: a new marker always forces a fresh version. UPDATE_TIME,
+    TABLE_ROWS and CREATE_TIME from information_schema only catch writes
+    made outside the loaders; they are approximate for InnoDB, so they are
+    read at most every RESULT_VERSION_CHECK_INTERVAL seconds and result
+    cache hits do not pay a metadata round trip each time.
+    """
+    markers = _loader_markers()
+    rows = _table_versions_cache.get(markers)
+    if rows is None:
+        with engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(text(_TABLE_VERSIONS_SQL))]
+        _table_versions_cache.set(markers, rows)
+    return _select_table_versions(query, rows, markers)
+
+async def aget_table_data_versions(query: str) -> tuple:
+    """Async counterpart of get_table_data_versions, on the async engine"""
+    markers = _loader_markers()
+    rows = _table_versions_cache.get(markers)
+    if rows is None:
+        async with async_engine.connect() as conn:
+            rows = [tuple(row) for row in await conn.execute(text(_TABLE_VERSIONS_SQL))]
+        _table_versions_cache.set(markers, rows)
+    return _select_table_versions(query, rows, markers)
+
+def _loader_markers() -> tuple:
+    return get_marker_version("schema"), get_marker_version("data")
+
+def _select_table_versions(query: str, rows: List[tuple], markers: tuple) -> tuple:
+    """Keep the versions of the tables referenced by query, plus the loader markers"""
+    identifiers = {name.lower() for name in re.findall(r'[A-Za-z0-9_$]+', normalize_query(query))}
+    versions = tuple(sorted(
+        (row[0], tuple(str(value) for value in row[1:]))
+        for row in rows if row[0].lower() in identifiers
+    ))
+    return versions, markers
+
+def invalidate_result_cache(tables: Optional[List[str]] = None) -> int:
+    """
+    Drop cached query results
+    
+    Parameters:
+    -----------
+    tables : Optional[List[str]]
+        Only drop results of queries that read any of these tables. If None, drops everything.
+    """
+    _table_versions_cache.invalidate()
+    if not tables:
+        return _result_cache.invalidate()
+    tables = set(tables)
+    # Las claves son (sql, max_rows, versiones por tabla, marcadores)
+    return _result_cache.invalidate(lambda key: any(table in tables for table, _ in key[2]))
+
+def get_result_cache_stats() -> Dict:
+    """Return hit/miss statistics of the query result cache"""
+    return _result_cache.stats()
+
+def run_query_rows(query: str, max_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Execute SQL query and return typed rows instead of a stringified result
+    
+    Results of read-only statements (SELECT, SHOW, WITH) are shared across
+    sessions through a cache keyed by the normalized SQL, max_rows and the
+    data version of the referenced tables, so loading new data invalidates them.
+    
+    Parameters:
+    -----------
+    query : str
+        SQL statement to execute
+    max_rows : Optional[int]
+        Stop fetching after this many rows. The result is flagged as truncated.
+    
+    Returns:
+    --------
+    Dict with "columns" (list of names), "rows" (list of tuples with the
+    driver's Python types), "row_count" and "truncated".
+    """
+    normalized = _get_cacheable_statement(query) if engine else None
+    if normalized is None:
+        return _execute_query_rows(query, max_rows)
+    
+    try:
+        cache_key = (normalized, max_rows, *get_table_data_versions(normalized))
+    except Exception as e:
+        logger.warning(f"Could not read table data versions, skipping result cache: {str(e)}")
+        return _execute_query_rows(query, max_rows)
+    
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Query result served from cache ({cached['row_count']} rows)")
+        set_attribute("db.cache_hit", True)
+        # Copia para que quien llama pueda agregar claves sin alterar la caché
+        return dict(cached)
+    
+    return _cache_result(cache_key, _execute_query_rows(query, max_rows))
+
+async def arun_query_rows(query: str, max_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Async counterpart of run_query_rows, sharing its result cache
+    
+    Runs on the async engine. If the async driver is not available, the
+    synchronous version is run in a worker thread instead.
+    """
+    if not async_engine:
+        return await asyncio.to_thread(run_query_rows, query, max_rows)
+    
+    normalized = _get_cacheable_statement(query)
+    if normalized is None:
+        return await _aexecute_query_rows(query, max_rows)
+    
+    try:
+        cache_key = (normalized, max_rows, *(await aget_table_data_versions(normalized)))
+    except Exception as e:
+        logger.warning(f"Could not read table data versions, skipping result cache: {str(e)}")
+        return await _aexecute_query_rows(query, max_rows)
+    
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Query result served from cache ({cached['row_count']} rows)")
+        set_attribute("db.cache_hit", True)
+        return dict(cached)
+    
+    return _cache_result(cache_key, await _aexecute_query_rows(query, max_rows))
+
+def _get_cacheable_statement(query: str) -> Optional[str]:
+    """Return the normalized statement if its result may be cached, else None"""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    normalized = normalize_query(query)
+    if not _CACHEABLE_STATEMENT.match(normalized) or _VOLATILE_STATEMENT.search(normalized):
+        return None
+    return normalized
+
+def _cache_result(cache_key: tuple, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Store a result unless it is too large, returning a copy for the caller"""
+    if result["row_count"] <= RESULT_CACHE_MAX_ROWS:
+        _result_cache.set(cache_key, result)
+    return dict(result)
+
+def _execute_query_rows(query: str, max_rows: Optional[int] = None) -> Dict[str, Any]:
+    """Execute SQL query on the shared engine, without going through the result cache"""
+    try:
+        if not engine:
+            raise Exception("Database engine not initialized")
+        
+        with engine.connect() as conn:
+            result = conn.execute(text(query))
+            if not result.returns_rows:
+                conn.commit()
+                return {"columns": [], "rows": [], "row_count": result.rowcount, "truncated": False}
+            
+            columns = list(result.keys())
+            if max_rows is None:
+                rows = [tuple(row) for row in result]
+                truncated = False
+            else:
+                rows = [tuple(row) for row in result.fetchmany(max_rows + 1)]
+                truncated = len(rows) > max_rows
+                rows = rows[:max_rows]
+        
+        logger.info(f"Query executed successfully ({len(rows)} rows)")
+        return {"columns": columns, "rows": rows, "row_count": len(rows), "truncated": truncated}
+    except Exception as e:
+        logger.error(f"Error executing query: {str(e)}")
+        raise
+
+async def _aexecute_query_rows(query: str, max_rows: Optional[int] = None) -> Dict[str, Any]:
+    """Execute SQL query on the async engine, without going through the result cache"""
+    try:
+        async with async_engine.connect() as conn:
+            result = await conn.execute(text(query))
+            if not result.returns_rows:
+                await conn.commit()
+                return {"columns": [], "rows": [], "row_count": result.rowcount, "truncated": False}
+            
+            columns = list(result.keys())
+            if max_rows is None:
+                rows = [tuple(row) for row in result]
+                truncated = False
+            else:
+                rows = [tuple(row) for row in result.fetchmany(max_rows + 1)]
+                truncated = len(rows) > max_rows
+                rows = rows[:max_rows]
+        
+        logger.info(f"Async query executed successfully ({len(rows)} rows)")
+        return {"columns": columns, "rows": rows, "row_count": len(rows), "truncated": truncated}
+    except Exception as e:
+        logger.error(f"Error executing async query: {str(e)}")
+        raise
+
+def stream_query(query: str, chunk_size: int = QUERY_STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Execute SQL query and yield the result in chunks of typed rows
+    
+    Uses a server-side cursor when the driver supports it, so memory stays
+    bounded by chunk_size. Each chunk is a dict with "columns" and "rows".
+    """
+    if not engine:
+        raise Exception("Database engine not initialized")
+    
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_size).execute(text(query))
+        columns = list(result.keys())
+        for partition in result.partitions():
+            yield {"columns": columns, "rows": [tuple(row) for row in partition]}
+
+def result_to_dataframe(result: Dict[str, Any]) -> pd.DataFrame:
+    """Convert a run_query_rows result into a DataFrame"""
+    return pd.DataFrame.from_records(result["rows"], columns=result["columns"])
+
+def apply_row_limit(query: str, limit: int) -> str:
+    """
+    Add a server-side LIMIT to a SELECT statement that has none
+    
+    Statements other than SELECT/WITH, and queries that already end with
+    a LIMIT clause, are returned unchanged.
+    """
+    statement = query.strip().rstrip(';').strip()
+    if not re.match(r'^(select|with)\b', statement, re.IGNORECASE):
+        return query
+    if re.search(r'\blimit\s+\d+(\s*,\s*\d+)?(\s+offset\s+\d+)?$', statement, re.IGNORECASE):
+        return query
+    return f"{statement}\nLIMIT {int(limit)};"
+
+def count_query_rows(query: str) -> Optional[int]:
+    """Count the rows a SELECT statement would return, or None if it cannot be counted"""
+    try:
+        statement = query.strip().rstrip(';')
+        result = run_query_rows(f"SELECT COUNT(*) FROM ({statement}) AS _khipu_count")
+        return result["rows"][0][0]
+    except Exception as e:
+        logger.warning(f"Could not count query rows: {str(e)}")
+        return None
@@ -1,41 +1,116 @@
-from typing import Optional
+from typing import Any, Dict, Optional
+import hashlib
+import threading
+import time
 from langchain_openai import ChatOpenAI
 from langchain_ollama import OllamaLLM
 from langchain_core.language_models.chat_models import BaseChatModel
-import streamlit as st
 import logging
 import requests
 from config.config import (
     OPENAI_MODELS, OLLAMA_MODELS, get_default_model,
-    OLLAMA_BASE_URL, get_provider_models
+    OLLAMA_BASE_URL, get_provider_models, LLM_REGISTRY_MAX_ENTRIES, LLM_REGISTRY_TTL,
+    OLLAMA_HEALTH_INTERVAL, OLLAMA_HEALTH_TIMEOUT
 )
+from .cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Clientes LLM compartidos por todas las sesiones, para reutilizar sus pools HTTP
+_llm_registry = TTLCache(
+    max_entries=LLM_REGISTRY_MAX_ENTRIES,
+    ttl=LLM_REGISTRY_TTL,
+    name="llm_registry"
+)
+
+class OllamaHealthChecker:
+    """
+    Process-wide Ollama status refreshed by a background thread.
+
+    The first caller probes synchronously once; afterwards a daemon thread
+    probes every OLLAMA_HEALTH_INTERVAL seconds and readers only get the
+    cached status, so Streamlit reruns never wait on the network.
+    """
+    _status: Dict[str, Any] = {"available": False, "models": [], "checked_at": None}
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _probe() -> Dict[str, Any]:
+        # /api/tags responde solo si el servidor está arriba y además trae los modelos
+        try:
+            response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=OLLAMA_HEALTH_TIMEOUT)
+            if response.status_code == 200:
+                models = [model['name'] for model in response.json().get('models', [])]
+                return {"available": True, "models": models, "checked_at": time.time()}
+        except Exception as e:
+            logger.debug(f"Ollama health check failed: {str(e)}")
+        return {"available": False, "models": [], "checked_at": time.time()}
+
+    @classmethod
+    def _run(cls):
+        while True:
+            time.sleep(OLLAMA_HEALTH_INTERVAL)
+            status = cls._probe()
+            if status["available"] != cls._status["available"]:
+                logger.info(f"Ollama availability changed: {status['available']}")
+            cls._status = status
+
+    @classmethod
+    def get_status(cls) -> Dict[str, Any]:
+        """Get the cached Ollama status, starting the background checker if needed"""
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                if cls._status["checked_at"] is None:
+                    cls._status = cls._probe()
+                cls._thread = threading.Thread(target=cls._run, name="ollama-health", daemon=True)
+                cls._thread.start()
+        return dict(cls._status)
+
 class LLMProvider:
     @staticmethod
     def get_llm(provider: str = "openai", model_name: Optional[str] = None, **kwargs) -> BaseChatModel:
+        """
+        Get a shared LLM client for the given settings
+        
+        Clients are kept in a bounded registry keyed by (provider, model,
+        temperature, api key hash), so repeated calls reuse the same
+        instance and its HTTP connections. Clients expire after
+        LLM_REGISTRY_TTL seconds, so those for replaced keys are released. OpenAI requires the key as api_key,
+        usually passed through RequestContext.llm_settings.
+        """
         try:
+            temperature = float(kwargs.get('temperature', 0.7))
+            
             if provider == "openai":
-                api_key = st.session_state.get('OPENAI_API_KEY')
+                api_key = kwargs.get('api_key')
                 if not api_key:
-                    raise ValueError("OpenAI API key not found in session state")
+                    raise ValueError("OpenAI API key not provided")
                 
                 model_info = OPENAI_MODELS.get(model_name or get_default_model("openai"))
                 if not model_info:
                     raise ValueError(f"Model {model_name} not found in configuration")
                 
-                return ChatOpenAI(
-                    model=model_info['model'],
-                    temperature=kwargs.get('temperature', 0.7),
-                    openai_api_key=api_key
+                # Solo se guarda el hash de la clave, nunca la clave
+                key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+                return _llm_registry.get_or_set(
+                    (provider, model_info['model'], temperature, key_hash),
+                    lambda: ChatOpenAI(
+                        model=model_info['model'],
+                        temperature=temperature,
+                        openai_api_key=api_key
+                    )
                 )
             
             elif provider == "ollama":
-                return OllamaLLM(
-                    model=model_name or get_default_model("ollama"),
-                    temperature=kwargs.get('temperature', 0.7),
-                    base_url=OLLAMA_BASE_URL
+                model = model_name or get_default_model("ollama")
+                return _llm_registry.get_or_set(
+                    (provider, model, temperature, OLLAMA_BASE_URL),
+                    lambda: OllamaLLM(
+                        model=model,
+                        temperature=temperature,
+                        base_url=OLLAMA_BASE_URL
+                    )
                 )
             
             else:
@@ -45,17 +120,14 @@ class LLMProvider:
             logger.error(f"Error initializing LLM provider: {str(e)}")
             raise
 
+    @staticmethod
+    def get_registry_stats() -> dict:
+        """Return hit/miss statistics of the LLM client registry"""
+        return _llm_registry.stats()
+
     @staticmethod
     def check_ollama_availability() -> bool:
-        try:
-            response = requests.get(f"{OLLAMA_BASE_URL}/api/version", timeout=2)
-            if response.status_code == 200:
-                models_response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=2)
-                if models_response.status_code == 200:
-                    return True
-            return False
-        except:
-            return False
+        return OllamaHealthChecker.get_status()["available"]
 
     @staticmethod
     def list_available_models(provider: str) -> list:
@@ -63,14 +135,8 @@ class LLMProvider:
             models = get_provider_models("openai")
             return sorted(models.keys(), key=lambda x: models[x]['priority'])
         elif provider == "ollama":
-            try:
-                response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=2)
-                if response.status_code == 200:
-                    models = response.json().get('models', [])
-                    return [model['name'] for model in models]
-            except:
-                pass
-            return [get_default_model("ollama")]
+            models = OllamaHealthChecker.get_status()["models"]
+            return models or [get_default_model("ollama")]
         return []
 
     @staticmethod
@@ -0,0 +1,317 @@
+# src/utils/profiling.py
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+from sqlalchemy import text, bindparam
+from config.config import (
+    PROFILE_CACHE_TTL, PROFILE_CACHE_MAX_ENTRIES,
+    PROFILE_TOP_K, PROFILE_BATCH_SIZE, ROW_COUNT_MODE,
+    ANALYSIS_TIMEOUT
+)
+from .cache import TTLCache, get_marker_version
+from .table_stats import TABLE_STATS_TABLE
+from . import database
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint",
+                 "decimal", "numeric", "float", "double", "real"}
+DATE_TYPES = {"date", "datetime", "timestamp"}
+CATEGORICAL_TYPES = {"char", "varchar", "enum"}
+
+# Perfiles por (tabla, tipo); cada entrada guarda la firma de la tabla con la que se calculó
+_profile_cache = TTLCache(
+    max_entries=PROFILE_CACHE_MAX_ENTRIES,
+    ttl=PROFILE_CACHE_TTL,
+    name="profile_cache"
+)
+
+class TableProfiler:
+    """Computes column profiles with one batched query per table and analysis kind"""
+
+    @staticmethod
+    def _quote(identifier: str) -> str:
+        """Quote an identifier for the current dialect"""
+        return database.engine.dialect.identifier_preparer.quote(identifier)
+
+    @staticmethod
+    def _fetch(query: str, params: Optional[Dict[str, Any]] = None, expanding: Tuple[str, ...] = (),
+               time_limited: bool = False) -> List[tuple]:
+        """
+        Execute a statement on the shared engine and return typed rows
+
+        With time_limited, MySQL aborts the statement after ANALYSIS_TIMEOUT,
+        so a profile that overruns its analysis branch frees its worker thread.
+        """
+        if not database.engine:
+            raise Exception("Database engine not initialized")
+        statement = text(query)
+        if expanding:
+            statement = statement.bindparams(*[bindparam(name, expanding=True) for name in expanding])
+        limit = time_limited and database.engine.dialect.name == "mysql"
+        with database.engine.connect() as conn:
+            if not limit:
+                return [tuple(row) for row in conn.execute(statement, params or {})]
+            conn.execute(text("SET SESSION max_execution_time = :ms"), {"ms": int(ANALYSIS_TIMEOUT * 1000)})
+            try:
+                return [tuple(row) for row in conn.execute(statement, params or {})]
+            finally:
+                # La conexión vuelve al pool: no dejar el límite para otras consultas
+                conn.execute(text("SET SESSION max_execution_time = DEFAULT"))
+
+    @staticmethod
+    def get_table_signatures(tables: List[str]) -> Dict[str, tuple]:
+        """
+        Get a cheap change signature for each table from information_schema.
+
+        Row count estimate, update/create time and data length change whenever
+        rows are loaded, so a profile computed under another signature is stale.
+        """
+        if not tables:
+            return {}
+        rows = TableProfiler._fetch(
+            """
+            SELECT TABLE_NAME, TABLE_ROWS, UPDATE_TIME, CREATE_TIME, DATA_LENGTH
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables
+            """,
+            {"tables": list(tables)},
+            expanding=("tables",)
+        )
+        marker = get_marker_version("data")
+        return {row[0]: tuple(str(value) for value in row[1:]) + (marker,) for row in rows}
+
+    @staticmethod
+    def get_columns(tables: List[str], include_keys: bool = False) -> Dict[str, List[Tuple[str, str]]]:
+        """Get (column, data type) pairs for all tables in a single query, skipping primary keys unless include_keys"""
+        if not tables:
+            return {}
+        key_filter = "" if include_keys else "AND COLUMN_KEY <> 'PRI'"
+        rows = TableProfiler._fetch(
+            f"""
+            SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables
+            {key_filter}
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """,
+            {"tables": list(tables)},
+            expanding=("tables",)
+        )
+        columns: Dict[str, List[Tuple[str, str]]] = {table: [] for table in tables}
+        for table, column, data_type in rows:
+            columns.setdefault(table, []).append((column, str(data_type).lower()))
+        return columns
+
+    @staticmethod
+    def _estimate_row_counts(tables: List[str]) -> Dict[str, int]:
+        """Get the InnoDB row estimates of all tables in a single query"""
+        rows = TableProfiler._fetch(
+            """
+            SELECT TABLE_NAME, TABLE_ROWS
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :tables
+            """,
+            {"tables": list(tables)},
+            expanding=("tables",)
+        )
+        return {table: int(count or 0) for table, count in rows}
+
+    @staticmethod
+    def _metadata_row_counts(tables: List[str]) -> Dict[str, int]:
+        """Get the row counts stored by the loaders in the table stats table"""
+        rows = TableProfiler._fetch(
+            f"""
+            SELECT table_name, row_count
+            FROM {TableProfiler._quote(TABLE_STATS_TABLE)}
+            WHERE table_name IN :tables
+            """,
+            {"tables": list(tables)},
+            expanding=("tables",)
+        )
+        return {table: int(count) for table, count in rows}
+
+    @staticmethod
+    def _exact_row_counts(tables: List[str]) -> Dict[str, int]:
+        """Get COUNT(*) of each table, only recounting tables whose signature changed"""
+        signatures = TableProfiler.get_table_signatures(tables)
+        counts = {}
+        for table in tables:
+            cached = _profile_cache.get((table, "row_count"))
+            if cached and cached[0] == signatures.get(table):
+                counts[table] = cached[1]
+                continue
+            count = TableProfiler._fetch(f"SELECT COUNT(*) FROM {TableProfiler._quote(table)}")[0][0]
+            _profile_cache.set((table, "row_count"), (signatures.get(table), count))
+            counts[table] = count
+        return counts
+
+    @staticmethod
+    def get_row_counts(tables: List[str], mode: str = ROW_COUNT_MODE) -> Tuple[Dict[str, int], Set[str]]:
+        """
+        Get the row count of each table without scanning it on every call
+
+        Parameters:
+        -----------
+        tables : List[str]
+            Tables to count
+        mode : str
+            'estimate' uses information_schema.TABLES.TABLE_ROWS, 'metadata'
+            the counts stored by the loaders (falling back to estimates for
+            tables they have not loaded) and 'exact' a COUNT(*) cached until
+            the table changes
+
+        Returns:
+        --------
+        Tuple of (table -> row count, tables whose count is an estimate)
+        """
+        if not tables:
+            return {}, set()
+        if mode == "exact":
+            return TableProfiler._exact_row_counts(tables), set()
+        if mode == "metadata":
+            try:
+                counts = TableProfiler._metadata_row_counts(tables)
+            except Exception as e:
+                logger.warning(f"Could not read {TABLE_STATS_TABLE}, using estimates: {str(e)}")
+                counts = {}
+            missing = [table for table in tables if table not in counts]
+            if missing:
+                counts.update(TableProfiler._estimate_row_counts(missing))
+            return counts, set(missing)
+        if mode != "estimate":
+            logger.warning(f"Unknown row count mode {mode}, using estimates")
+        return TableProfiler._estimate_row_counts(tables), set(tables)
+
+    @staticmethod
+    def _profile_numeric(table: str, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Compute mean, std dev, min and max of every numeric column in one SELECT"""
+        aggregates = []
+        for col in columns:
+            quoted = TableProfiler._quote(col)
+            aggregates.extend([
+                f"AVG({quoted})", f"STDDEV({quoted})",
+                f"MIN({quoted})", f"MAX({quoted})"
+            ])
+        query = f"SELECT COUNT(*), {', '.join(aggregates)} FROM {TableProfiler._quote(table)}"
+        row = TableProfiler._fetch(query, time_limited=True)[0]
+        count = row[0]
+        profile = {}
+        for idx, col in enumerate(columns):
+            mean, std_dev, min_val, max_val = row[1 + idx * 4: 5 + idx * 4]
+            profile[col] = {
+                "mean": mean,
+                "std_dev": std_dev,
+                "min_val": min_val,
+                "max_val": max_val,
+                "count": count
+            }
+        return profile
+
+    @staticmethod
+    def _profile_temporal(table: str, columns: List[str]) -> Dict[str, List[tuple]]:
+        """Compute year/month row distribution of the date columns, batched with UNION ALL"""
+        profile = {col: [] for col in columns}
+        quoted_table = TableProfiler._quote(table)
+        for start in range(0, len(columns), PROFILE_BATCH_SIZE):
+            batch = columns[start:start + PROFILE_BATCH_SIZE]
+            parts = []
+            for idx, col in enumerate(batch):
+                quoted = TableProfiler._quote(col)
+                parts.append(f"""
+                SELECT {start + idx} AS col_idx, YEAR({quoted}) AS year, MONTH({quoted}) AS month, COUNT(*) AS count
+                FROM {quoted_table}
+                GROUP BY YEAR({quoted}), MONTH({quoted})
+                """)
+            query = " UNION ALL ".join(parts) + " ORDER BY col_idx, year, month"
+            for col_idx, year, month, count in TableProfiler._fetch(query, time_limited=True):
+                profile[columns[col_idx]].append((year, month, count))
+        return profile
+
+    @staticmethod
+    def _profile_categorical(table: str, columns: List[str]) -> Dict[str, List[tuple]]:
+        """Compute the top-k values of the categorical columns, batched with UNION ALL"""
+        profile = {col: [] for col in columns}
+        quoted_table = TableProfiler._quote(table)
+        for start in range(0, len(columns), PROFILE_BATCH_SIZE):
+            batch = columns[start:start + PROFILE_BATCH_SIZE]
+            parts = []
+            for idx, col in enumerate(batch):
+                quoted = TableProfiler._quote(col)
+                parts.append(f"""
+                (SELECT {start + idx} AS col_idx, {quoted} AS value, COUNT(*) AS count
+                FROM {quoted_table}
+                GROUP BY {quoted}
+                ORDER BY count DESC
+                LIMIT {PROFILE_TOP_K})
+                """)
+            query = " UNION ALL ".join(parts)
+            for col_idx, value, count in TableProfiler._fetch(query, time_limited=True):
+                profile[columns[col_idx]].append((value, count))
+        return profile
+
+    @staticmethod
+    def get_profiles(tables: List[str], kind: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get cached column profiles of one kind for the given tables
+
+        Parameters:
+        -----------
+        tables : List[str]
+            Tables to profile
+        kind : str
+            'numeric', 'temporal' or 'categorical'
+
+        Returns:
+        --------
+        Dict mapping "table.column" to the profile of that column
+        """
+        profilers = {
+            "numeric": (NUMERIC_TYPES, TableProfiler._profile_numeric),
+            "temporal": (DATE_TYPES, TableProfiler._profile_temporal),
+            "categorical": (CATEGORICAL_TYPES, TableProfiler._profile_categorical)
+        }
+        if kind not in profilers:
+            raise ValueError(f"Unknown profile kind: {kind}")
+        types, profiler = profilers[kind]
+
+        signatures = TableProfiler.get_table_signatures(tables)
+        results = {}
+        missing = []
+        for table in tables:
+            cached = _profile_cache.get((table, kind))
+            if cached and cached[0] == signatures.get(table):
+                results[table] = cached[1]
+            else:
+                missing.append(table)
+
+        if missing:
+            table_columns = TableProfiler.get_columns(missing)
+            for table in missing:
+                columns = [col for col, data_type in table_columns.get(table, []) if data_type in types]
+                try:
+                    profile = profiler(table, columns) if columns else {}
+                except Exception as e:
+                    logger.error(f"Error profiling {kind} columns of {table}: {str(e)}")
+                    continue
+                _profile_cache.set((table, kind), (signatures.get(table), profile))
+                results[table] = profile
+            logger.info(f"Computed {kind} profiles for tables: {missing}")
+
+        return {
+            f"{table}.{col}": profile
+            for table in tables
+            for col, profile in results.get(table, {}).items()
+        }
+
+    @staticmethod
+    def invalidate(tables: Optional[List[str]] = None) -> int:
+        """Drop cached profiles for the given tables, or for all tables"""
+        if not tables:
+            return _profile_cache.invalidate()
+        tables = set(tables)
+        return _profile_cache.invalidate(lambda key: key[0] in tables)
+
+    @staticmethod
+    def get_cache_stats() -> Dict:
+        """Return hit/miss statistics of the profile cache"""
+        return _profile_cache.stats()
@@ -3,17 +3,46 @@ from langchain_openai import OpenAIEmbeddings  # Actualizado
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, DirectoryLoader
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
+import hashlib
+import json
 import logging
 import os
+import threading
+import time
+import faiss
+from config.config import (
+    EMBEDDING_CACHE_PATH, RAG_CHUNK_SIZE, RAG_CHUNK_OVERLAP,
+    VECTOR_STORE_DIR, DOCS_WATCH_INTERVAL
+)
+from .embedding_cache import EmbeddingCache, CachedEmbeddings
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_EXTENSIONS = {".pdf", ".txt", ".md"}
+MANIFEST_FILE = "manifest.json"
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide embedding cache, creating it on first use"""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(Path(EMBEDDING_CACHE_PATH))
+        return _embedding_cache
+
+def get_embedding_cache_stats() -> Dict:
+    """Return hit/miss statistics of the embedding cache"""
+    return get_embedding_cache().stats()
+
 def initialize_embeddings(api_key: str):
-    """Initialize OpenAI embeddings"""
+    """Initialize OpenAI embeddings behind the content-addressed embedding cache"""
     try:
-        return OpenAIEmbeddings(openai_api_key=api_key)
+        embeddings = OpenAIEmbeddings(openai_api_key=api_key)
+        return CachedEmbeddings(embeddings, get_embedding_cache())
     except Exception as e:
         logger.error(f"Error initializing embeddings: {e}")
         raise
@@ -78,13 +107,7 @@ def create_vector_store(documents: List, embeddings) -> Optional[FAISS]:
             logger.warning("No documents provided for vector store creation")
             return None
             
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            is_separator_regex=False
-        )
-        chunks = text_splitter.split_documents(documents)
+        chunks = _get_text_splitter().split_documents(documents)
         
         if not chunks:
             logger.warning("No chunks created from documents")
@@ -96,4 +119,270 @@ def create_vector_store(documents: List, embeddings) -> Optional[FAISS]:
         
     except Exception as e:
         logger.error(f"Error creating vector store: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def _get_text_splitter() -> RecursiveCharacterTextSplitter:
+    """Text splitter shared by full and incremental index builds"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=RAG_CHUNK_SIZE,
+        chunk_overlap=RAG_CHUNK_OVERLAP,
+        length_function=len,
+        is_separator_regex=False
+    )
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_file(path: Path) -> List:
+    """Load a single document with the loader matching its extension"""
+    if path.suffix.lower() == ".pdf":
+        return PyPDFLoader(str(path)).load()
+    return TextLoader(str(path)).load()
+
+def scan_documents(docs_path: Path, previous: Optional[Dict] = None) -> Dict[str, Dict]:
+    """
+    List supported documents with their size, mtime and content hash.
+
+    Hashes from the previous manifest are reused when size and mtime did not change.
+    """
+    previous = previous or {}
+    files = {}
+    if not docs_path.exists():
+        return files
+
+    for path in sorted(docs_path.rglob("*")):
+        if not path.is_file() or path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+            continue
+        stat = path.stat()
+        source = str(path)
+        old = previous.get(source, {})
+        if old.get("mtime") == stat.st_mtime and old.get("size") == stat.st_size:
+            sha256 = old["sha256"]
+        else:
+            sha256 = _file_sha256(path)
+        files[source] = {
+            "sha256": sha256,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "type": path.suffix.lower().lstrip(".")
+        }
+    return files
+
+def _load_manifest(index_dir: Path) -> Dict:
+    try:
+        with open(index_dir / MANIFEST_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(index_dir: Path, manifest: Dict):
+    # Escribir en un archivo temporal y reemplazar para no dejar un manifest a medias
+    tmp_path = index_dir / f"{MANIFEST_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, index_dir / MANIFEST_FILE)
+
+def _save_vector_store(vector_store: FAISS, index_dir: Path):
+    """
+    Save the index next to the live files and swap them in with os.replace.
+
+    Processes that memory-mapped the previous index keep reading the old
+    file instead of seeing it rewritten underneath them.
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    tmp_dir = index_dir / "tmp"
+    vector_store.save_local(str(tmp_dir))
+    for name in ("index.faiss", "index.pkl"):
+        os.replace(tmp_dir / name, index_dir / name)
+    tmp_dir.rmdir()
+
+def load_or_update_vector_store(docs_path: Path, embeddings, index_dir: Path) -> Tuple[Optional[FAISS], Dict]:
+    """
+    Load the persisted FAISS index and bring it up to date with docs_path.
+
+    Only new or changed files are chunked and embedded; chunks of changed
+    and deleted files are removed from the index. The index and a manifest
+    with the hash, mtime and chunk ids of every file are saved to index_dir.
+
+    Returns:
+    --------
+    Tuple of the vector store (None if there are no documents) and the
+    manifest "files" mapping of source path to file info.
+    """
+    try:
+        index_dir = Path(index_dir)
+        manifest = _load_manifest(index_dir)
+        embedding_model = getattr(embeddings, "model", type(embeddings).__name__)
+        chunking = {"chunk_size": RAG_CHUNK_SIZE, "chunk_overlap": RAG_CHUNK_OVERLAP}
+
+        # Un cambio de modelo o de chunking reconstruye todo; el cache de embeddings lo abarata
+        vector_store = None
+        previous_files = {}
+        if (manifest.get("embedding_model") == embedding_model
+                and manifest.get("chunking") == chunking
+                and (index_dir / "index.faiss").exists()):
+            try:
+                vector_store = FAISS.load_local(
+                    str(index_dir), embeddings,
+                    allow_dangerous_deserialization=True,
+                    io_flags=faiss.IO_FLAG_MMAP
+                )
+                previous_files = manifest.get("files", {})
+            except Exception as e:
+                logger.warning(f"Could not load persisted vector store, rebuilding: {e}")
+
+        current_files = scan_documents(docs_path, previous_files)
+        changed = [
+            source for source, info in current_files.items()
+            if previous_files.get(source, {}).get("sha256") != info["sha256"]
+        ]
+        removed = [
+            source for source, info in previous_files.items()
+            if source not in current_files or source in changed
+        ]
+
+        if not changed and not removed:
+            logger.info(f"Vector store up to date ({len(current_files)} documents)")
+            return (vector_store if current_files else None), current_files
+
+        # Quitar chunks de documentos modificados o eliminados
+        stale_ids = [chunk_id for source in removed for chunk_id in previous_files[source].get("ids", [])]
+        if vector_store and stale_ids:
+            vector_store.delete(stale_ids)
+            logger.info(f"Removed {len(stale_ids)} chunks from {len(removed)} documents")
+
+        for source in current_files:
+            if source not in changed:
+                current_files[source]["ids"] = previous_files[source].get("ids", [])
+                current_files[source]["chunks"] = previous_files[source].get("chunks", 0)
+
+        # Embeber solo documentos nuevos o modificados
+        text_splitter = _get_text_splitter()
+        for source in changed:
+            info = current_files[source]
+            try:
+                chunks = text_splitter.split_documents(_load_file(Path(source)))
+            except Exception as e:
+                logger.error(f"Error loading {source}: {e}")
+                chunks = []
+            ids = [f"{source}#{info['sha256'][:16]}-{idx}" for idx in range(len(chunks))]
+            if chunks:
+                if vector_store:
+                    vector_store.add_documents(chunks, ids=ids)
+                else:
+                    vector_store = FAISS.from_documents(chunks, embeddings, ids=ids)
+            info["ids"] = ids
+            info["chunks"] = len(chunks)
+            logger.info(f"Embedded {len(chunks)} chunks from {source}")
+
+        if vector_store is None or not current_files:
+            return None, current_files
+
+        _save_vector_store(vector_store, index_dir)
+        _save_manifest(index_dir, {
+            "embedding_model": embedding_model,
+            "chunking": chunking,
+            "files": current_files
+        })
+        logger.info(f"Vector store saved to {index_dir}")
+        return vector_store, current_files
+
+    except Exception as e:
+        logger.error(f"Error loading or updating vector store: {e}")
+        return None, {}
+
+def get_docs_fingerprint(docs_path: Path) -> Tuple:
+    """Cheap change detector for docs_path based on file paths, sizes and mtimes"""
+    if not docs_path.exists():
+        return ()
+    return tuple(
+        (str(path), path.stat().st_mtime, path.stat().st_size)
+        for path in sorted(docs_path.rglob("*"))
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+    )
+
+class SharedVectorStore:
+    """
+    Process-wide, read-only vector store shared by all sessions.
+
+    The first caller builds (or loads) the index; afterwards sessions only
+    read it. When docs_path changes, a background thread builds a new store
+    and swaps the reference, so readers never see a half-updated index. This
+    also applies when the first build found no documents.
+
+    The store keeps no embeddings of its own: builds use the embeddings of
+    the session that triggered them, and each session embeds its queries
+    with its own (see RAGService._get_relevant_context).
+    """
+    _store: Optional[FAISS] = None
+    _files: Dict[str, Dict] = {}
+    _docs_path: Optional[Path] = None
+    _fingerprint: Tuple = ()
+    _last_check = 0.0
+    _refreshing = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def initialize(cls, docs_path: Path, embeddings) -> Optional[FAISS]:
+        """Build the shared store on first use; later calls only check for document changes"""
+        with cls._lock:
+            first = cls._docs_path is None
+            if first:
+                cls._docs_path = docs_path
+                cls._fingerprint = get_docs_fingerprint(docs_path)
+                cls._last_check = time.monotonic()
+                cls._store, cls._files = load_or_update_vector_store(docs_path, embeddings, Path(VECTOR_STORE_DIR))
+        if not first:
+            cls._refresh_if_changed(embeddings)
+        return cls._store
+
+    @classmethod
+    def get(cls, embeddings=None) -> Optional[FAISS]:
+        """
+        Get the current store, scheduling a rebuild with embeddings if the
+        documents changed. Without embeddings the change check is skipped.
+        """
+        cls._refresh_if_changed(embeddings)
+        return cls._store
+
+    @classmethod
+    def get_documents(cls) -> Dict[str, Dict]:
+        """Get source path -> {'chunks', 'type'} for the indexed documents"""
+        return {
+            source: {"chunks": info.get("chunks", 0), "type": info.get("type", "")}
+            for source, info in cls._files.items()
+        }
+
+    @classmethod
+    def _refresh_if_changed(cls, embeddings):
+        with cls._lock:
+            if (cls._docs_path is None or embeddings is None or cls._refreshing
+                    or time.monotonic() - cls._last_check < DOCS_WATCH_INTERVAL):
+                return
+            cls._last_check = time.monotonic()
+            fingerprint = get_docs_fingerprint(cls._docs_path)
+            if fingerprint == cls._fingerprint:
+                return
+            cls._refreshing = True
+
+        logger.info("Documents changed, rebuilding shared vector store in background")
+        threading.Thread(target=cls._rebuild, args=(fingerprint, embeddings), daemon=True).start()
+
+    @classmethod
+    def _rebuild(cls, fingerprint: Tuple, embeddings):
+        try:
+            # load_or_update_vector_store carga una copia nueva; la actual sigue sirviendo consultas
+            store, files = load_or_update_vector_store(cls._docs_path, embeddings, Path(VECTOR_STORE_DIR))
+            with cls._lock:
+                cls._store, cls._files = store, files
+                cls._fingerprint = fingerprint
+            logger.info("Shared vector store swapped")
+        except Exception as e:
+            logger.error(f"Error rebuilding shared vector store: {e}")
+        finally:
+            with cls._lock:
+                cls._refreshing = False
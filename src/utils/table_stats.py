@@ -0,0 +1,40 @@
+# src/utils/table_stats.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tabla de metadatos mantenida por los loaders; la app la excluye de la lista de tablas
+TABLE_STATS_TABLE = "_khipu_table_stats"
+
+def update_table_stats(cursor, table_name: str):
+    """
+    Store the exact row count of a table in TABLE_STATS_TABLE.
+
+    Called by the loaders in scripts/mysql after each load, so the app can
+    show exact counts without running COUNT(*) per question. Takes a DB-API
+    cursor; the caller commits.
+    """
+    # '_' es comodín en LIKE: comparar el nombre exacto
+    cursor.execute(
+        "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (TABLE_STATS_TABLE,)
+    )
+    if cursor.fetchone() is None:
+        try:
+            cursor.execute(f"""
+                CREATE TABLE `{TABLE_STATS_TABLE}` (
+                    table_name VARCHAR(64) PRIMARY KEY,
+                    row_count BIGINT NOT NULL,
+                    updated_at DATETIME NOT NULL
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """)
+        except Exception as e:
+            # Otro loader en paralelo la creó entre la verificación y el CREATE
+            if getattr(e, 'errno', None) != 1050:
+                raise
+    cursor.execute(
+        f"REPLACE INTO `{TABLE_STATS_TABLE}` (table_name, row_count, updated_at) "
+        f"SELECT %s, COUNT(*), NOW() FROM `{table_name}`",
+        (table_name,)
+    )
+    logger.info(f"Row count of {table_name} stored in {TABLE_STATS_TABLE}")
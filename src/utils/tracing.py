@@ -0,0 +1,222 @@
+# src/utils/tracing.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import asyncio
+import functools
+import json
+import logging
+import threading
+import time
+import uuid
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from config.config import TRACING_ENABLED, TRACE_EXPORT_PATH
+
+logger = logging.getLogger(__name__)
+
+# Span activo en el contexto actual; los hilos y tareas lo heredan al copiar el contexto
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+class Span:
+    """One timed stage of a trace, with attributes such as row or token counts"""
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.status = "OK"
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def set_attribute(self, key: str, value: Any):
+        with self._lock:
+            self.attributes[key] = value
+
+    def add(self, key: str, amount: float):
+        """Increment a numeric attribute, e.g. tokens over several LLM calls"""
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def set_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.status_message = str(error)
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    def to_record(self) -> Dict[str, Any]:
+        """OpenTelemetry-style span record"""
+        end_ns = self.end_ns or time.time_ns()
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": end_ns,
+            "duration_ms": round((end_ns - self.start_ns) / 1e6, 3),
+            "attributes": dict(self.attributes),
+            "status": {"code": self.status, "message": self.status_message}
+        }
+
+class Trace:
+    """
+    Spans of one question, from SQL generation to the formatted answer.
+
+    Stages open child spans with span() or @traced while the trace is
+    active. A trace can be activated several times, e.g. once to prepare
+    a streamed answer and again while the tokens are consumed.
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = self._new_span(name, None, attributes)
+
+    def _new_span(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> Span:
+        span = Span(self, name, parent_id, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def activate(self) -> Iterator["Trace"]:
+        token = _current_span.set(self.root)
+        try:
+            yield self
+        except BaseException as e:
+            self.root.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+
+    def records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [span.to_record() for span in sorted(self.spans, key=lambda s: s.start_ns)]
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """End the root span and export the trace, returning its span records"""
+        self.root.end()
+        for key in ("llm.prompt_tokens", "llm.completion_tokens", "llm.total_tokens"):
+            tokens = sum(span.attributes.get(key, 0) for span in self.spans if span is not self.root)
+            if tokens:
+                self.root.set_attribute(key, tokens)
+        records = self.records()
+        if TRACING_ENABLED and TRACE_EXPORT_PATH:
+            export_records(records)
+        return records
+
+def start_trace(name: str, **attributes) -> Trace:
+    """Start a trace; stages are recorded while it is active"""
+    return Trace(name, **attributes)
+
+def export_records(records: List[Dict[str, Any]], path: str = TRACE_EXPORT_PATH):
+    """Append span records to a JSONL file"""
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        with _export_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+    except Exception as e:
+        logger.error(f"Error exporting trace: {str(e)}")
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def set_attribute(key: str, value: Any):
+    """Set an attribute on the active span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_attribute(key, value)
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a stage as a child of the active span
+
+    Does nothing (yields None) when no trace is active or tracing is disabled.
+    """
+    parent = _current_span.get()
+    if parent is None or not TRACING_ENABLED:
+        yield None
+        return
+    child = parent.trace._new_span(name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.set_error(e)
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+def traced(name: str) -> Callable:
+    """Decorator recording each call of a function or coroutine function as a span"""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Adds LLM token counts and time to first token to the active span
+
+    Token usage is taken from whatever the provider reports: OpenAI's
+    token_usage, usage_metadata of chat messages, or Ollama's eval counts.
+    """
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        active = _current_span.get()
+        if active is not None and "llm.first_token_ms" not in active.attributes:
+            active.set_attribute("llm.first_token_ms", round((time.time_ns() - active.start_ns) / 1e6, 3))
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        active = _current_span.get()
+        if active is None:
+            return
+        prompt_tokens, completion_tokens = TokenUsageCallback._usage(response)
+        active.add("llm.calls", 1)
+        active.add("llm.prompt_tokens", prompt_tokens)
+        active.add("llm.completion_tokens", completion_tokens)
+        active.add("llm.total_tokens", prompt_tokens + completion_tokens)
+
+    @staticmethod
+    def _usage(response: LLMResult) -> tuple:
+        usage = (response.llm_output or {}).get("token_usage")
+        if usage:
+            return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+        prompt_tokens, completion_tokens = 0, 0
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                info = generation.generation_info or {}
+                if metadata:
+                    prompt_tokens += metadata.get("input_tokens", 0)
+                    completion_tokens += metadata.get("output_tokens", 0)
+                else:
+                    prompt_tokens += info.get("prompt_eval_count", 0) or 0
+                    completion_tokens += info.get("eval_count", 0) or 0
+        return prompt_tokens, completion_tokens
+
+# Sin estado propio: una instancia sirve para todas las cadenas
+token_usage_callback = TokenUsageCallback()